@@ -1,20 +1,25 @@
 import os
-from typing import Dict, Any, List
+from typing import Dict, Any, Iterator, List, Optional, Tuple
 from dotenv import load_dotenv
-from langchain_google_genai import ChatGoogleGenerativeAI, GoogleGenerativeAIEmbeddings
-from langchain.prompts import ChatPromptTemplate
-from langchain.output_parsers import PydanticOutputParser
-from langchain.chains import LLMChain
-from langchain.tools import Tool
-from langchain.agents import initialize_agent, AgentType
-from pydantic import BaseModel, Field
-from utils import search_vector_store, VectorStore
-from langchain_community.vectorstores import Chroma
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-import requests
-from bs4 import BeautifulSoup
+from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.output_parsers import PydanticOutputParser
+from pydantic import BaseModel, Field, field_validator
+from utils import ResultCache, SingleFlight, locked_cached_property, StreamingJSONObjectParser, ContextBuilder, MainTextExtractor, description_key
+from llm_cache import cached_chain_run, cached_chain_stream
+from tracing import get_tracer
+from endpoints import external_url
+from taxonomy import DOMAIN_TAXONOMY, normalize_domain, normalize_regions
+from clients import LazyClients
+import codecs
 from datetime import datetime
 import json
+import time
+import hashlib
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+# The Google SDKs, Chroma, requests and the regulatory index are imported where they are first used so
+# importing this module and constructing agents stays cheap (see bench_import.py)
 
 load_dotenv()
 
@@ -44,62 +49,104 @@ class RiskProfile(BaseModel):
     source: str = Field(description="Source of the risk analysis")
     justification: str = Field(description="Justification for the identified risks")
 
-class BusinessModelAnalyzer:
+class BusinessAnalysis(BaseModel):
+    """Schema for the structured business model analysis"""
+    domain: str = Field(description=f"Primary business domain, one of: {', '.join(DOMAIN_TAXONOMY)}")
+    regions: List[str] = Field(description="Countries or regions of operation as ISO 3166 codes (e.g. US, US-CA, EU, GB)")
+    target_market: str = Field(description="Short description of the target market")
+    activities: List[str] = Field(description="Key business activities", default_factory=list)
+
+    @field_validator("domain")
+    @classmethod
+    def _canonical_domain(cls, value: str) -> str:
+        return normalize_domain(value)
+
+    @field_validator("regions")
+    @classmethod
+    def _canonical_regions(cls, value: List[str]) -> List[str]:
+        return normalize_regions(value)
+
+class BusinessModelAnalyzer(LazyClients):
+    collection_name = "business_analysis"
+    # Deterministic sampling keeps the extraction stable and cacheable
+    temperature = 0
+
     def __init__(self):
-        self.llm = ChatGoogleGenerativeAI(
-            model="gemini-1.5-flash",
-            google_api_key=os.getenv("GOOGLE_API_KEY"),
-            temperature=0.7,
-            convert_system_message_to_human=True
-        )
-        self.embeddings = GoogleGenerativeAIEmbeddings(
-            model="models/embedding-001",
-            google_api_key=os.getenv("GOOGLE_API_KEY")
-        )
-        self.vector_db = Chroma(
-            persist_directory="./chroma_db",
-            embedding_function=self.embeddings,
-            collection_name="business_analysis"
-        )
+        self.parser = PydanticOutputParser(pydantic_object=BusinessAnalysis)
         self.prompt = ChatPromptTemplate.from_messages([
             ("system", """You are a business model analyzer. Analyze the given business description and identify:
             1. Primary business domain (e.g., fintech, healthtech, e-commerce)
             2. Operational geography (countries/regions of operation)
             3. Target market
             4. Key business activities
-            Return the analysis in a structured format."""),
+            {format_instructions}"""),
             ("human", "{business_description}")
-        ])
+        ]).partial(format_instructions=self.parser.get_format_instructions())
+
+    def _parse_analysis(self, result: str, business_description: str) -> BusinessAnalysis:
+        """Parse the LLM output, falling back to keyword extraction from the description"""
+        try:
+            return self.parser.parse(result)
+        except Exception as e:
+            print(f"Error parsing business analysis, using keyword fallback: {str(e)}")
+            return BusinessAnalysis(
+                domain=business_description,
+                regions=[business_description],
+                target_market="Not specified",
+                activities=[]
+            )
 
-    def analyze(self, business_description: str) -> Dict[str, str]:
-        chain = LLMChain(llm=self.llm, prompt=self.prompt)
-        result = chain.run(business_description=business_description)
+    def analyze(self, business_description: str, refresh: bool = False) -> Dict[str, Any]:
+        result = cached_chain_run(self.llm, self.prompt, refresh=refresh, business_description=business_description)
+        return self._store_analysis(result, business_description)
+
+    def analyze_stream(self, business_description: str, refresh: bool = False) -> Iterator[Dict[str, Any]]:
+        """
+        Stream the business model analysis.
+        
+        Yields {"type": "token", "text": ...} chunks of the raw LLM output, then a
+        final {"type": "result", "data": ...} event matching analyze.
+        """
+        parts = []
+        for text in cached_chain_stream(self.llm, self.prompt, refresh=refresh, business_description=business_description):
+            parts.append(text)
+            yield {"type": "token", "text": text}
+        yield {"type": "result", "data": self._store_analysis("".join(parts), business_description)}
+
+    def _store_analysis(self, result: str, business_description: str) -> Dict[str, Any]:
+        """Parse the raw analysis, store it and return the canonical fields"""
+        analysis = self._parse_analysis(result, business_description)
+        geography = ", ".join(analysis.regions)
         
         # Store in vector DB
         self.vector_db.add_texts(
             texts=[business_description],
-            metadatas=[{"type": "business_analysis", "result": result}]
+            metadatas=[{
+                "type": "business_analysis",
+                "domain": analysis.domain,
+                "geography": geography,
+                "result": analysis.model_dump_json(),
+                "created_at": time.time()
+            }]
         )
         
-        return {"domain": result, "geography": result}
+        return {
+            "domain": analysis.domain,
+            "geography": geography,
+            "regions": analysis.regions,
+            "target_market": analysis.target_market,
+            "activities": analysis.activities,
+            "operations": ", ".join(analysis.activities) or "Not specified"
+        }
+
+class RiskDetectionAgent(LazyClients):
+    collection_name = "risk_profiles"
+    # Risks are extracted into a fixed JSON schema; deterministic and cacheable
+    temperature = 0
 
-class RiskDetectionAgent:
     def __init__(self):
-        self.llm = ChatGoogleGenerativeAI(
-            model="gemini-1.5-flash",
-            google_api_key=os.getenv("GOOGLE_API_KEY"),
-            temperature=0.7,
-            convert_system_message_to_human=True
-        )
-        self.embeddings = GoogleGenerativeAIEmbeddings(
-            model="models/embedding-001",
-            google_api_key=os.getenv("GOOGLE_API_KEY")
-        )
-        self.vector_db = Chroma(
-            persist_directory="./chroma_db",
-            embedding_function=self.embeddings,
-            collection_name="risk_profiles"
-        )
+        # Parsed risk objects keyed by stored document id
+        self._parsed_risks = ResultCache(max_entries=4096, ttl=0)
         
         # Initialize risk detection prompt
         self.risk_detection_prompt = ChatPromptTemplate.from_messages([
@@ -107,101 +154,94 @@ class RiskDetectionAgent:
             ("human", "Analyze risks for: Domain: {domain}, Geography: {geography}, Stage: {stage}, Description: {description}")
         ])
 
-    def _retrieve_similar_risks(self, domain: str, geography: str, threshold: float = 0.7) -> List[Dict[str, Any]]:
-        """Retrieve similar risks from vector DB"""
+    def _retrieve_similar_risks(self, domain: str, geography: str, stage: str = "MVP", threshold: float = 0.5) -> List[Dict[str, Any]]:
+        """Retrieve similar risks stored for the same domain, geography and stage"""
         query = f"{domain} {geography} legal risks"
-        results = self.vector_db.similarity_search_with_score(query, k=5)
+        try:
+            # Relevance scores are normalized to [0, 1] where higher is more similar,
+            # unlike the raw Chroma distances returned by similarity_search_with_score
+            results = self.vector_db.similarity_search_with_relevance_scores(
+                query,
+                k=5,
+                filter={"$and": [
+                    {"type": "risk_profile"},
+                    {"domain": domain},
+                    {"geography": geography},
+                    {"stage": stage}
+                ]}
+            )
+        except Exception as e:
+            print(f"Error retrieving similar risks: {str(e)}")
+            return []
         
         similar_risks = []
         for doc, score in results:
-            if score >= threshold:
+            if score < threshold:
+                continue
+            risk_id = doc.metadata.get("risk_id") or hashlib.sha256(doc.page_content.encode("utf-8")).hexdigest()
+            risk_data = self._parsed_risks.get(risk_id)
+            if risk_data is None:
                 try:
                     risk_data = json.loads(doc.page_content)
-                    similar_risks.append(risk_data)
-                except:
+                except (ValueError, TypeError):
                     continue
+                self._parsed_risks.set(risk_id, risk_data)
+            similar_risks.append(risk_data)
         
         return similar_risks
 
     def _parse_llm_response(self, response: str) -> List[Dict[str, Any]]:
         """Parse LLM response into structured risk objects"""
-        try:
-            # Try to parse as JSON
-            risks = json.loads(response)
-            if isinstance(risks, list):
-                return risks
-        except:
-            # If JSON parsing fails, try to extract risks from text
-            risks = []
-            current_risk = {}
-            
-            for line in response.split('\n'):
-                line = line.strip()
-                if not line:
-                    continue
-                
-                if '"risk_name":' in line:
-                    if current_risk:
-                        risks.append(current_risk)
-                    current_risk = {'risk_name': line.split('"risk_name":')[1].strip().strip('",')}
-                elif '"law_or_framework":' in line:
-                    current_risk['law_or_framework'] = line.split('"law_or_framework":')[1].strip().strip('",')
-                elif '"description":' in line:
-                    current_risk['description'] = line.split('"description":')[1].strip().strip('",')
-                elif '"severity":' in line:
-                    current_risk['severity'] = line.split('"severity":')[1].strip().strip('",')
-                elif '"status":' in line:
-                    current_risk['status'] = line.split('"status":')[1].strip().strip('",')
-            
-            if current_risk:
-                risks.append(current_risk)
-        
-        return risks
+        return [risk for risk in StreamingJSONObjectParser().feed(response) if risk.get('risk_name')]
 
-    def analyze_risks(self, domain: str, geography: str, stage: str = "MVP", description: str = "") -> Dict[str, Any]:
-        """Analyze risks based on startup context"""
-        # 1. Try to retrieve similar risks from vector DB
-        similar_risks = self._retrieve_similar_risks(domain, geography)
-        
-        # 2. If not enough similar risks found, use LLM
-        if len(similar_risks) < 3:
-            chain = LLMChain(llm=self.llm, prompt=self.risk_detection_prompt)
-            response = chain.run(
-                domain=domain,
-                geography=geography,
-                stage=stage,
-                description=description
-            )
-            
-            # Parse LLM response
-            llm_risks = self._parse_llm_response(response)
-            
-            # Combine with similar risks
-            all_risks = similar_risks + llm_risks
-            
-            # Remove duplicates based on risk_name
-            seen_risks = set()
-            unique_risks = []
-            for risk in all_risks:
-                if risk['risk_name'] not in seen_risks:
-                    seen_risks.add(risk['risk_name'])
-                    unique_risks.append(risk)
-            
-            risks = unique_risks
-        else:
-            risks = similar_risks
-        
-        # Store in vector DB
-        for risk in risks:
+    @staticmethod
+    def _risk_id(risk: Dict[str, Any], domain: str, geography: str, stage: str) -> str:
+        """Deterministic id for a risk within its business context"""
+        key = json.dumps({"risk": risk, "domain": domain, "geography": geography, "stage": stage}, sort_keys=True)
+        return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+    def _store_risks(self, risks: List[Dict[str, Any]], domain: str, geography: str, stage: str) -> None:
+        """Upsert risks in one bulk call, skipping any already stored"""
+        risks_by_id = {self._risk_id(risk, domain, geography, stage): risk for risk in risks}
+        if not risks_by_id:
+            return
+        try:
+            existing = set(self.vector_db.get(ids=list(risks_by_id), include=[])["ids"])
+            new_ids = [risk_id for risk_id in risks_by_id if risk_id not in existing]
+            if not new_ids:
+                return
             self.vector_db.add_texts(
-                texts=[json.dumps(risk)],
+                texts=[json.dumps(risks_by_id[risk_id]) for risk_id in new_ids],
                 metadatas=[{
                     "type": "risk_profile",
                     "domain": domain,
                     "geography": geography,
-                    "stage": stage
-                }]
+                    "stage": stage,
+                    "risk_id": risk_id,
+                    "created_at": time.time()
+                } for risk_id in new_ids],
+                ids=new_ids
             )
+        except Exception as e:
+            print(f"Error storing risks: {str(e)}")
+
+    def _build_risk_profile(self,
+                            similar_risks: List[Dict[str, Any]],
+                            llm_risks: List[Dict[str, Any]],
+                            domain: str,
+                            geography: str,
+                            stage: str) -> Dict[str, Any]:
+        """Merge, store and summarize retrieved and newly generated risks"""
+        # Remove duplicates based on risk_name
+        seen_risks = set()
+        risks = []
+        for risk in similar_risks + llm_risks:
+            if risk['risk_name'] not in seen_risks:
+                seen_risks.add(risk['risk_name'])
+                risks.append(risk)
+        
+        # Store new risks in vector DB
+        self._store_risks([risk for risk in risks if risk not in similar_risks], domain, geography, stage)
         
         # Calculate overall risk level
         severity_scores = {'High': 3, 'Medium': 2, 'Low': 1}
@@ -218,23 +258,71 @@ class RiskDetectionAgent:
             "risk_categories": list(set(r.get('law_or_framework', '').split(':')[0] for r in risks if r.get('law_or_framework', '')))
         }
 
-class LegalRetrieverAgent:
+    def analyze_risks(self, domain: str, geography: str, stage: str = "MVP", description: str = "", refresh: bool = False) -> Dict[str, Any]:
+        """Analyze risks based on startup context"""
+        # 1. Try to retrieve similar risks from vector DB
+        similar_risks = self._retrieve_similar_risks(domain, geography, stage)
+        
+        # 2. If not enough similar risks found, use LLM
+        llm_risks = []
+        if len(similar_risks) < 3:
+            response = cached_chain_run(
+                self.llm,
+                self.risk_detection_prompt,
+                refresh=refresh,
+                domain=domain,
+                geography=geography,
+                stage=stage,
+                description=description
+            )
+            llm_risks = self._parse_llm_response(response)
+        
+        return self._build_risk_profile(similar_risks, llm_risks, domain, geography, stage)
+
+    def analyze_risks_stream(self, domain: str, geography: str, stage: str = "MVP", description: str = "", refresh: bool = False) -> Iterator[Dict[str, Any]]:
+        """
+        Stream risks as soon as each one is complete.
+        
+        Yields {"type": "risk", "risk": ...} events for every retrieved or generated
+        risk, followed by a single {"type": "result", "data": ...} event holding the
+        same profile analyze_risks would return.
+        """
+        similar_risks = self._retrieve_similar_risks(domain, geography, stage)
+        for risk in similar_risks:
+            yield {"type": "risk", "risk": risk}
+        
+        llm_risks = []
+        if len(similar_risks) < 3:
+            parser = StreamingJSONObjectParser()
+            seen_risks = {risk['risk_name'] for risk in similar_risks}
+            for chunk in cached_chain_stream(
+                self.llm,
+                self.risk_detection_prompt,
+                refresh=refresh,
+                domain=domain,
+                geography=geography,
+                stage=stage,
+                description=description
+            ):
+                for risk in parser.feed(chunk):
+                    if not risk.get('risk_name'):
+                        continue
+                    llm_risks.append(risk)
+                    if risk['risk_name'] not in seen_risks:
+                        seen_risks.add(risk['risk_name'])
+                        yield {"type": "risk", "risk": risk}
+        
+        yield {"type": "result", "data": self._build_risk_profile(similar_risks, llm_risks, domain, geography, stage)}
+
+class LegalRetrieverAgent(LazyClients):
+    collection_name = "legal_documents"
+    # Summaries restate the retrieved sources; deterministic and cacheable
+    temperature = 0
+
     def __init__(self):
-        self.llm = ChatGoogleGenerativeAI(
-            model="gemini-1.5-flash",
-            google_api_key=os.getenv("GOOGLE_API_KEY"),
-            temperature=0.7,
-            convert_system_message_to_human=True
-        )
-        self.embeddings = GoogleGenerativeAIEmbeddings(
-            model="models/embedding-001",
-            google_api_key=os.getenv("GOOGLE_API_KEY")
-        )
-        self.vector_db = Chroma(
-            persist_directory="./chroma_db",
-            embedding_function=self.embeddings,
-            collection_name="legal_documents"
-        )
+        
+        # Summary prompts are packed into a fixed token budget
+        self.context_builder = ContextBuilder(max_tokens=3000, max_passage_tokens=500)
         
         # Initialize Hugging Face model for legal text classification
         self.hf_token = os.getenv("HUGGINGFACE_TOKEN")
@@ -268,38 +356,59 @@ class LegalRetrieverAgent:
             ("human", "Query: {query}\nContext: {context}")
         ])
 
-    def _scrape_legal_website(self, url: str, headers: Dict[str, str] = None) -> str:
-        """Scrape content from legal websites"""
+    def _scrape_legal_website(self, url: str, headers: Dict[str, str] = None,
+                              max_chars: int = 1000, max_bytes: int = 512 * 1024,
+                              timeout: float = 10.0) -> str:
+        """Scrape the main text of a legal website.
+
+        The page is streamed and parsed incrementally; reading stops once
+        `max_chars` of main-content text is collected or `max_bytes` is read.
+        """
+        import requests
         try:
-            response = requests.get(url, headers=headers or {'User-Agent': 'Mozilla/5.0'})
-            soup = BeautifulSoup(response.text, 'html.parser')
-            
-            # Remove unwanted elements
-            for element in soup.find_all(['script', 'style', 'nav', 'footer']):
-                element.decompose()
-            
-            # Extract main content
-            content = soup.get_text(separator='\n', strip=True)
-            return content
+            with get_tracer().span("scrape", url=url) as span:
+                with requests.get(external_url(url), headers=headers or {'User-Agent': 'Mozilla/5.0'},
+                                  stream=True, timeout=timeout) as response:
+                    span["status"] = response.status_code
+                    extractor = MainTextExtractor(max_chars=max_chars)
+                    try:
+                        decoder = codecs.getincrementaldecoder(response.encoding or "utf-8")(errors="replace")
+                    except LookupError:
+                        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+                    received = 0
+                    for chunk in response.iter_content(chunk_size=16384):
+                        received += len(chunk)
+                        extractor.feed(decoder.decode(chunk))
+                        if extractor.done or received >= max_bytes:
+                            break
+                    span["bytes"] = received
+                    span["early_stop"] = extractor.done
+                return extractor.text()
         except Exception as e:
             print(f"Error scraping {url}: {str(e)}")
             return ""
 
     def _query_huggingface_model(self, text: str, task: str = "legal-classification") -> Dict[str, Any]:
         """Query Hugging Face model for legal text analysis"""
+        import requests
         try:
             API_URL = f"https://api-inference.huggingface.co/models/legal-bert-base-uncased"
-            response = requests.post(API_URL, headers=self.headers, json={"inputs": text})
-            return response.json()
+            with get_tracer().span("hf_classifier", chars=len(text)) as span:
+                response = requests.post(external_url(API_URL), headers=self.headers, json={"inputs": text})
+                span["status"] = response.status_code
+                return response.json()
         except Exception as e:
             print(f"Error querying Hugging Face model: {str(e)}")
             return {}
 
     def _fetch_legal_api_data(self, api_url: str, params: Dict[str, Any]) -> Dict[str, Any]:
         """Fetch data from legal APIs"""
+        import requests
         try:
-            response = requests.get(api_url, params=params)
-            return response.json()
+            with get_tracer().span("legal_api", url=api_url) as span:
+                response = requests.get(external_url(api_url), params=params)
+                span["status"] = response.status_code
+                return response.json()
         except Exception as e:
             print(f"Error fetching from {api_url}: {str(e)}")
             return {}
@@ -307,8 +416,9 @@ class LegalRetrieverAgent:
     def _fetch_gov_regulations(self, jurisdiction: str, query: str) -> List[Dict[str, Any]]:
         """Fetch regulations from government APIs"""
         regulations = []
+        regions = normalize_regions(jurisdiction.split(","))
         
-        if jurisdiction.lower() in ['us', 'united states']:
+        if any(region == 'US' or region.startswith('US-') for region in regions):
             api_url = self.gov_apis['us_gov']
             params = {
                 'api_key': os.getenv('REGULATIONS_GOV_API_KEY'),
@@ -319,7 +429,7 @@ class LegalRetrieverAgent:
             if data and 'data' in data:
                 regulations.extend(data['data'])
         
-        elif jurisdiction.lower() in ['eu', 'european union']:
+        if 'EU' in regions:
             api_url = self.gov_apis['eu_gov']
             params = {
                 'q': query,
@@ -331,8 +441,44 @@ class LegalRetrieverAgent:
         
         return regulations
 
-    def retrieve_legal_info(self, query: str, jurisdiction: str) -> Dict[str, Any]:
-        """Retrieve legal information using multiple sources"""
+    @locked_cached_property
+    def regulatory_index(self):
+        """The offline index snapshot, loaded on first lookup; None if none has been built.
+
+        Scraping and live APIs are only used without one.
+        """
+        from regulatory_index import get_regulatory_index
+        return get_regulatory_index()
+
+    def _search_regulatory_index(self, query: str, jurisdiction: str, k: int = 8) -> List[Dict[str, Any]]:
+        """Read-only lookup in the offline index snapshot"""
+        try:
+            query_vector = self.embeddings.embed_query(f"{query} {jurisdiction}")
+        except Exception as e:
+            # BM25 alone still answers from the snapshot
+            print(f"Error embedding query, using keyword search only: {str(e)}")
+            query_vector = None
+        with get_tracer().span("regulatory_index", version=self.regulatory_index.version) as span:
+            results = self.regulatory_index.search(
+                f"{query} {jurisdiction}",
+                query_vector,
+                k=k,
+                jurisdictions=normalize_regions(jurisdiction.split(","))
+            )
+            span["results"] = len(results)
+        return [{
+            "source": result["source"],
+            "content": result["content"],
+            "type": "regulation",
+            "jurisdiction": result["jurisdiction"],
+            "score": result["score"]
+        } for result in results]
+
+    def _collect_legal_info(self, query: str, jurisdiction: str) -> List[Dict[str, Any]]:
+        """Gather, classify and store legal information from all sources"""
+        if self.regulatory_index is not None:
+            return self._search_regulatory_index(query, jurisdiction)
+        
         legal_info = []
         
         # 1. Scrape legal websites
@@ -373,7 +519,9 @@ class LegalRetrieverAgent:
                     "type": "legal_info",
                     "source": info['source'],
                     "query": query,
-                    "jurisdiction": jurisdiction
+                    "jurisdiction": jurisdiction,
+                    # Lets chroma_maintenance.py expire stale scrapes and API results
+                    "created_at": time.time()
                 }
                 if 'analysis' in info:
                     metadata['analysis'] = str(info['analysis'])  # Convert analysis to string
@@ -388,48 +536,87 @@ class LegalRetrieverAgent:
             except Exception as e:
                 print(f"Error adding to vector DB: {str(e)}")
         
+        return legal_info
+
+    def _build_context(self, query: str, jurisdiction: str, legal_info: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Pack collected sources into the summary prompt budget"""
+        return self.context_builder.build(f"{query} {jurisdiction}", [{
+            "text": info['content'],
+            "source": info['source'],
+            "score": info.get('score')
+        } for info in legal_info])
+
+    def retrieve_legal_info(self, query: str, jurisdiction: str, refresh: bool = False) -> Dict[str, Any]:
+        """Retrieve legal information using multiple sources"""
+        legal_info = self._collect_legal_info(query, jurisdiction)
+        
         # Generate summary using LLM
-        context = "\n".join([info['content'] for info in legal_info if info['content']])
-        chain = LLMChain(llm=self.llm, prompt=self.prompt)
-        summary = chain.run(query=query, context=context)
+        context = self._build_context(query, jurisdiction, legal_info)
+        summary = cached_chain_run(self.llm, self.prompt, refresh=refresh, query=query, context=context["context"])
         
         return {
             "summary": summary,
             "sources": legal_info,
+            "context_sources": context["sources"],
             "jurisdiction": jurisdiction,
             "query": query
         }
 
-class ChecklistGeneratorAgent:
-    def __init__(self):
-        self.llm = ChatGoogleGenerativeAI(
-            model="gemini-1.5-flash",
-            google_api_key=os.getenv("GOOGLE_API_KEY"),
-            temperature=0.7,
-            convert_system_message_to_human=True
-        )
-        self.embeddings = GoogleGenerativeAIEmbeddings(
-            model="models/embedding-001",
-            google_api_key=os.getenv("GOOGLE_API_KEY")
-        )
-        self.vector_db = Chroma(
-            persist_directory="./chroma_db",
-            embedding_function=self.embeddings,
-            collection_name="compliance_checklists"
-        )
+    def retrieve_legal_info_stream(self, query: str, jurisdiction: str, refresh: bool = False) -> Iterator[Dict[str, Any]]:
+        """
+        Stream legal information retrieval.
+        
+        Yields {"type": "source", "source": ...} for every collected source, then
+        {"type": "token", "text": ...} chunks of the summary, then a final
+        {"type": "result", "data": ...} event matching retrieve_legal_info.
+        """
+        legal_info = self._collect_legal_info(query, jurisdiction)
+        for info in legal_info:
+            yield {"type": "source", "source": info}
+        
+        context = self._build_context(query, jurisdiction, legal_info)
+        parts = []
+        for text in cached_chain_stream(self.llm, self.prompt, refresh=refresh, query=query, context=context["context"]):
+            parts.append(text)
+            yield {"type": "token", "text": text}
+        
+        yield {"type": "result", "data": {
+            "summary": "".join(parts),
+            "sources": legal_info,
+            "context_sources": context["sources"],
+            "jurisdiction": jurisdiction,
+            "query": query
+        }}
+
+class ChecklistGeneratorAgent(LazyClients):
+    collection_name = "compliance_checklists"
+
+    # Checklist sections and the keywords used to route risks and legal docs to them.
+    # Anything that matches no keywords falls through to the last section.
+    SECTIONS = {
+        "Data Privacy & Protection": ["privacy", "data", "gdpr", "hipaa", "ccpa", "personal", "consent", "breach", "security"],
+        "Intellectual Property": ["intellectual property", "patent", "trademark", "copyright", "trade secret", "licens"],
+        "Tax & Financial Compliance": ["tax", "vat", "financial", "accounting", "payment", "securities", "anti-money", "aml"],
+        "Corporate & Operational": ["corporate", "contract", "incorporat", "governance", "liability", "consumer", "terms of service"],
+        "Employment & Labor": ["employ", "labor", "labour", "hiring", "wage", "contractor", "workplace"],
+        "Sector-Specific Regulations": []
+    }
+    # Used for sections that no risk or legal document was routed to, instead of a generation
+    EMPTY_SECTION_TEXT = "No specific findings for this category. Revisit as the business or its markets change."
+
+    def __init__(self, similarity_threshold: float = 0.9, freshness_days: float = 30):
+        # A stored section is reused for a changed section when its risks are at
+        # least this similar and it is no older than the freshness window
+        self.similarity_threshold = similarity_threshold
+        self.freshness_days = freshness_days
+        # Per-section prompt budgets for risks and legal docs
+        self.risk_context_builder = ContextBuilder(max_tokens=1200, max_passage_tokens=200)
+        self.legal_context_builder = ContextBuilder(max_tokens=1200, max_passage_tokens=300)
         self.prompt = ChatPromptTemplate.from_messages([
-            ("system", """You are a compliance checklist generator expert. Create a comprehensive compliance checklist based on:
+            ("system", """You are a compliance checklist generator expert. Create the "{section}" section of a compliance checklist based on:
             1. Business domain and geography
-            2. Identified legal risks
-            3. Retrieved legal documents and regulations
-            
-            Organize the checklist into clear categories:
-            - Data Privacy & Protection
-            - Intellectual Property
-            - Tax & Financial Compliance
-            - Corporate & Operational
-            - Employment & Labor
-            - Sector-Specific Regulations
+            2. Identified legal risks relevant to this section
+            3. Retrieved legal documents and regulations relevant to this section
             
             For each item, provide:
             - Clear action item
@@ -438,6 +625,7 @@ class ChecklistGeneratorAgent:
             - Implementation timeline
             - Required documentation
             
+            Only cover the "{section}" category. Do not repeat the section title.
             Format the output in a structured, easy-to-follow checklist format."""),
             ("human", """Business Info:
             Domain: {domain}
@@ -451,12 +639,163 @@ class ChecklistGeneratorAgent:
             {legal_docs}""")
         ])
 
+    def _find_similar_section(self, name: str, inputs: Dict[str, str]) -> Optional[Tuple[str, float]]:
+        """Find a fresh stored section for the same business context and a similar set of section risks"""
+        try:
+            results = self.vector_db.similarity_search_with_relevance_scores(
+                f"{name}\n{inputs['risks']}",
+                k=3,
+                filter={"$and": [
+                    {"type": "checklist_section"},
+                    {"section": name},
+                    {"domain": inputs["domain"]},
+                    {"geography": inputs["geography"]},
+                    {"stage": inputs["stage"]}
+                ]}
+            )
+        except Exception as e:
+            print(f"Error searching stored checklist sections: {str(e)}")
+            return None
+
+        oldest_allowed = time.time() - self.freshness_days * 24 * 3600
+        for doc, score in results:
+            if score < self.similarity_threshold:
+                continue
+            if doc.metadata.get("created_at", 0) < oldest_allowed:
+                continue
+            if doc.metadata.get("section_text"):
+                return doc.metadata["section_text"], score
+        return None
+
+    @staticmethod
+    def _format_risks(risks: List[Dict[str, Any]]) -> str:
+        return "\n".join([
+            f"- {risk.get('risk_name', 'Unknown')}: {risk.get('description', 'No description')} "
+            f"(Severity: {risk.get('severity', 'Medium')})"
+            for risk in risks
+        ])
+
+    def _budget_risks(self, query: str, risks: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Pack a section's risks into its prompt budget, most relevant first"""
+        return self.risk_context_builder.build(query, [{
+            "text": f"{risk.get('risk_name', 'Unknown')}: {risk.get('description', 'No description')} "
+                    f"(Severity: {risk.get('severity', 'Medium')})",
+            "source": risk.get('risk_name', 'Unknown'),
+            "header": "- "
+        } for risk in risks])
+
+    def _budget_legal_docs(self, query: str, legal_docs: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Pack a section's legal docs into its prompt budget, most relevant first"""
+        return self.legal_context_builder.build(query, [{
+            "text": doc.get('summary') or doc.get('content') or '',
+            "source": doc.get('source', 'Unknown'),
+            "header": "- "
+        } for doc in legal_docs])
+
+    def _categorize(self, text: str) -> str:
+        """Map a risk or legal document to its checklist section"""
+        text = text.lower()
+        for name, keywords in self.SECTIONS.items():
+            if any(keyword in text for keyword in keywords):
+                return name
+        return list(self.SECTIONS)[-1]
+
+    def _section_inputs(self,
+                        domain: str,
+                        geography: str,
+                        stage: str,
+                        risks: List[Dict[str, Any]],
+                        legal_docs: List[Dict[str, Any]]) -> Dict[str, Dict[str, str]]:
+        """Group risks and legal docs by section and fingerprint each section's inputs"""
+        grouped = {name: {"risks": [], "legal_docs": []} for name in self.SECTIONS}
+        for risk in risks:
+            text = f"{risk.get('risk_name', '')} {risk.get('law_or_framework', '')} {risk.get('description', '')}"
+            grouped[self._categorize(text)]["risks"].append(risk)
+        for doc in legal_docs:
+            text = f"{doc.get('summary', '')} {doc.get('content', '')}"
+            grouped[self._categorize(text)]["legal_docs"].append(doc)
+
+        section_inputs = {}
+        for name, group in grouped.items():
+            query = f"{name} {domain} {geography}"
+            risks_context = self._budget_risks(query, group["risks"])
+            docs_context = self._budget_legal_docs(query, group["legal_docs"])
+            inputs = {
+                "section": name,
+                "domain": domain,
+                "geography": geography,
+                "stage": stage,
+                "risks": risks_context["context"] or "None identified",
+                "legal_docs": docs_context["context"] or "None retrieved"
+            }
+            inputs["fingerprint"] = hashlib.sha256(
+                json.dumps(inputs, sort_keys=True).encode("utf-8")
+            ).hexdigest()
+            inputs["context_sources"] = risks_context["sources"] + docs_context["sources"]
+            inputs["empty"] = not (group["risks"] or group["legal_docs"])
+            section_inputs[name] = inputs
+        return section_inputs
+
+    def _load_sections(self, fingerprints: Dict[str, str]) -> Dict[str, str]:
+        """Load previously generated sections whose inputs are unchanged"""
+        try:
+            stored = self.vector_db.get(ids=list(fingerprints.values()))
+        except Exception as e:
+            print(f"Error loading checklist sections: {str(e)}")
+            return {}
+        by_id = dict(zip(stored.get("ids", []), stored.get("metadatas", [])))
+        return {
+            name: by_id[fingerprint]["section_text"]
+            for name, fingerprint in fingerprints.items()
+            if fingerprint in by_id and by_id[fingerprint].get("section_text")
+        }
+
+    def _generate_section(self, name: str, inputs: Dict[str, str], refresh: bool = False) -> str:
+        return cached_chain_run(
+            self.llm,
+            self.prompt,
+            refresh=refresh,
+            section=name,
+            domain=inputs["domain"],
+            geography=inputs["geography"],
+            stage=inputs["stage"],
+            risks=inputs["risks"],
+            legal_docs=inputs["legal_docs"]
+        )
+
+    def _build_section(self, name: str, inputs: Dict[str, str], refresh: bool = False) -> Tuple[str, Optional[float]]:
+        """Reuse a near-identical stored section, otherwise generate it; returns (text, similarity or None)"""
+        similar = None if refresh else self._find_similar_section(name, inputs)
+        if similar:
+            return similar
+        return self._generate_section(name, inputs, refresh=refresh), None
+
+    def _store_sections(self, section_inputs: Dict[str, Dict[str, str]], generated: Dict[str, str]) -> None:
+        """Store generated sections keyed by their input fingerprint"""
+        try:
+            self.vector_db.add_texts(
+                texts=[f"{name}\n{section_inputs[name]['risks']}" for name in generated],
+                metadatas=[{
+                    "type": "checklist_section",
+                    "section": name,
+                    "domain": section_inputs[name]["domain"],
+                    "geography": section_inputs[name]["geography"],
+                    "stage": section_inputs[name]["stage"],
+                    "section_text": text,
+                    "created_at": time.time()
+                } for name, text in generated.items()],
+                ids=[section_inputs[name]["fingerprint"] for name in generated]
+            )
+        except Exception as e:
+            print(f"Error storing checklist sections: {str(e)}")
+
     def generate_checklist(self, 
                          domain: str, 
                          geography: str, 
                          stage: str,
                          risks: List[Dict[str, Any]],
-                         legal_docs: List[Dict[str, Any]]) -> Dict[str, Any]:
+                         legal_docs: List[Dict[str, Any]],
+                         refresh: bool = False) -> Dict[str, Any]:
         """
         Generate a compliance checklist based on business information, risks, and legal documents.
         
@@ -466,52 +805,100 @@ class ChecklistGeneratorAgent:
             stage: Business stage (e.g., early-stage, growth)
             risks: List of identified risks from RiskDetectionAgent
             legal_docs: List of legal documents from LegalRetrieverAgent
+            refresh: Regenerate every section, ignoring stored checklists and cached responses
             
         Returns:
-            Dict containing the generated checklist and metadata
+            Dict containing the generated checklist, its per-section breakdown and metadata
         """
-        # Format risks and legal docs for prompt
-        risks_text = "\n".join([
-            f"- {risk.get('risk_name', 'Unknown')}: {risk.get('description', 'No description')} "
-            f"(Severity: {risk.get('severity', 'Medium')})"
-            for risk in risks
-        ])
+        for event in self.generate_checklist_stream(domain, geography, stage, risks, legal_docs, refresh=refresh):
+            if event["type"] == "result":
+                return event["data"]
+
+    def generate_checklist_stream(self,
+                                  domain: str,
+                                  geography: str,
+                                  stage: str,
+                                  risks: List[Dict[str, Any]],
+                                  legal_docs: List[Dict[str, Any]],
+                                  refresh: bool = False) -> Iterator[Dict[str, Any]]:
+        """
+        Stream checklist generation section by section.
         
-        legal_docs_text = "\n".join([
-            f"- {doc.get('summary', 'No summary available')}"
-            for doc in legal_docs
-        ])
+        Yields {"type": "section", "name": ..., "text": ...} as each section becomes
+        available (stored sections first, rebuilt ones as they complete), then a
+        final {"type": "result", "data": ...} event matching generate_checklist.
+        """
+        risks_text = self._format_risks(risks)
+
+        # Split inputs by section and only rebuild sections whose inputs changed;
+        # sections with nothing routed to them get a static entry instead of an LLM call.
+        # A changed section reuses a stored one with near-identical risks before generating
+        section_inputs = self._section_inputs(domain, geography, stage, risks, legal_docs)
+        sections = {name: self.EMPTY_SECTION_TEXT for name, inputs in section_inputs.items() if inputs["empty"]}
+        if not refresh:
+            sections.update(self._load_sections({
+                name: inputs["fingerprint"] for name, inputs in section_inputs.items() if not inputs["empty"]
+            }))
+        stale = [name for name in section_inputs if name not in sections]
+        for name, text in sections.items():
+            yield {"type": "section", "name": name, "text": text}
         
-        # Generate checklist using LLM
-        chain = LLMChain(llm=self.llm, prompt=self.prompt)
-        checklist = chain.run(
-            domain=domain,
-            geography=geography,
-            stage=stage,
-            risks=risks_text,
-            legal_docs=legal_docs_text
-        )
+        generated = {}
+        reused = {}
+        if stale:
+            with ThreadPoolExecutor(max_workers=len(stale)) as executor:
+                # Copy the caller's context so sections keep its request priority
+                futures = {
+                    executor.submit(contextvars.copy_context().run, self._build_section, name, section_inputs[name], refresh): name
+                    for name in stale
+                }
+                for future in as_completed(futures):
+                    name = futures[future]
+                    text, similarity = future.result()
+                    if similarity is None:
+                        generated[name] = text
+                    else:
+                        reused[name] = similarity
+                    sections[name] = text
+                    yield {"type": "section", "name": name, "text": text}
+            if generated:
+                self._store_sections(section_inputs, generated)
         
-        # Store in vector DB
+        sections = {name: sections[name] for name in self.SECTIONS}
+        checklist = "\n\n".join(f"## {name}\n\n{text}" for name, text in sections.items())
+        
+        # Store in vector DB, embedded by risk set so later requests can find it.
+        # The id is derived from the business context so regenerating upserts it
+        checklist_id = hashlib.sha256(
+            json.dumps(["compliance_checklist", domain, geography, stage]).encode("utf-8")
+        ).hexdigest()
         self.vector_db.add_texts(
-            texts=[checklist],
+            texts=[risks_text or checklist],
             metadatas=[{
                 "type": "compliance_checklist",
                 "domain": domain,
                 "geography": geography,
-                "stage": stage
-            }]
+                "stage": stage,
+                "checklist": checklist,
+                "created_at": time.time()
+            }],
+            ids=[checklist_id]
         )
         
-        return {
+        yield {"type": "result", "data": {
             "checklist": checklist,
+            "sections": sections,
             "metadata": {
                 "domain": domain,
                 "geography": geography,
                 "stage": stage,
-                "generated_at": str(datetime.now())
+                "generated_at": str(datetime.now()),
+                "regenerated_sections": [name for name in stale if name in generated],
+                "reused_sections": reused,
+                "empty_sections": [name for name, inputs in section_inputs.items() if inputs["empty"]],
+                "context_sources": {name: inputs["context_sources"] for name, inputs in section_inputs.items()}
             }
-        }
+        }}
 
 class ComplianceWorkflow:
     def __init__(self):
@@ -519,40 +906,108 @@ class ComplianceWorkflow:
         self.risk_detector = RiskDetectionAgent()
         self.legal_retriever = LegalRetrieverAgent()
         self.checklist_generator = ChecklistGeneratorAgent()
+        # Risk and legal stages depend only on canonical domain/geography, so many
+        # businesses share their results
+        self.stage_cache = ResultCache(max_entries=512, ttl=3600)
+        # Concurrent identical analyses and stage inputs wait for one computation
+        self.in_flight = SingleFlight()
 
-    def analyze_business(self, business_description: str) -> Dict[str, Any]:
+    def _cached_stage(self, stage: str, key: Tuple[str, ...], compute, refresh: bool = False) -> Dict[str, Any]:
+        cache_key = json.dumps([stage, *key])
+        result = None if refresh else self.stage_cache.get(cache_key)
+        if result is None:
+            result = self.in_flight.do(
+                self._flight_key(cache_key, refresh),
+                lambda: self._compute_stage(cache_key, compute, refresh)
+            )
+        return result
+
+    def _compute_stage(self, cache_key: str, compute, refresh: bool = False) -> Dict[str, Any]:
+        # A flight that finished just before this one started may have filled the cache
+        result = None if refresh else self.stage_cache.get(cache_key)
+        if result is None:
+            result = compute()
+            self.stage_cache.set(cache_key, result)
+        return result
+
+    @staticmethod
+    def _flight_key(key: str, refresh: bool) -> str:
+        # A refresh must not join a run that may be serving cached results
+        return json.dumps(["refresh", key]) if refresh else key
+
+    @staticmethod
+    def _checklist_key(domain: str, geography: str, risks: List[Dict[str, Any]], legal_docs: List[Dict[str, Any]]) -> str:
+        inputs = json.dumps([domain, geography, risks, legal_docs], sort_keys=True, default=str)
+        return json.dumps(["checklist", hashlib.sha256(inputs.encode("utf-8")).hexdigest()])
+
+    def analyze_business(self, business_description: str, refresh: bool = False) -> Dict[str, Any]:
         """
         Run the complete compliance analysis workflow.
         
         Args:
             business_description: Detailed description of the business
+            refresh: Recompute every stage, bypassing the stage cache, the LLM
+                response cache and stored checklists
             
         Returns:
             Dict containing all analysis results including the final checklist
         """
+        with get_tracer().trace("analyze_business"):
+            return self.in_flight.do(
+                self._flight_key(json.dumps(["analysis", description_key(business_description)]), refresh),
+                lambda: self._analyze_business(business_description, refresh)
+            )
+
+    def _analyze_business(self, business_description: str, refresh: bool = False) -> Dict[str, Any]:
         # Step 1: Analyze business model
-        business_analysis = self.business_analyzer.analyze(business_description)
+        with get_tracer().span("stage.business_analysis"):
+            business_analysis = self.business_analyzer.analyze(business_description, refresh=refresh)
         
         # Step 2: Detect risks
-        risk_analysis = self.risk_detector.analyze_risks(
-            domain=business_analysis["domain"],
-            geography=business_analysis["geography"]
-        )
+        with get_tracer().span("stage.risk_detection"):
+            risk_analysis = self._cached_stage(
+                "risks",
+                (business_analysis["domain"], business_analysis["geography"]),
+                lambda: self.risk_detector.analyze_risks(
+                    domain=business_analysis["domain"],
+                    geography=business_analysis["geography"],
+                    refresh=refresh
+                ),
+                refresh=refresh
+            )
         
         # Step 3: Retrieve legal information
-        legal_info = self.legal_retriever.retrieve_legal_info(
-            query=f"{business_analysis['domain']} compliance",
-            jurisdiction=business_analysis["geography"]
-        )
+        query = f"{business_analysis['domain']} compliance"
+        with get_tracer().span("stage.legal_retrieval"):
+            legal_info = self._cached_stage(
+                "legal",
+                (query, business_analysis["geography"]),
+                lambda: self.legal_retriever.retrieve_legal_info(
+                    query=query,
+                    jurisdiction=business_analysis["geography"],
+                    refresh=refresh
+                ),
+                refresh=refresh
+            )
         
         # Step 4: Generate compliance checklist
-        checklist = self.checklist_generator.generate_checklist(
-            domain=business_analysis["domain"],
-            geography=business_analysis["geography"],
-            stage="Early-stage",  # This could be made dynamic based on business description
-            risks=risk_analysis["risks"],
-            legal_docs=legal_info["sources"]
-        )
+        with get_tracer().span("stage.checklist"):
+            checklist = self.in_flight.do(
+                self._flight_key(self._checklist_key(
+                    business_analysis["domain"],
+                    business_analysis["geography"],
+                    risk_analysis["risks"],
+                    legal_info["sources"]
+                ), refresh),
+                lambda: self.checklist_generator.generate_checklist(
+                    domain=business_analysis["domain"],
+                    geography=business_analysis["geography"],
+                    stage="Early-stage",  # This could be made dynamic based on business description
+                    risks=risk_analysis["risks"],
+                    legal_docs=legal_info["sources"],
+                    refresh=refresh
+                )
+            )
         
         return {
             "business_analysis": business_analysis,
@@ -561,6 +1016,95 @@ class ComplianceWorkflow:
             "compliance_checklist": checklist
         }
 
+    def analyze_business_stream(self, business_description: str, refresh: bool = False) -> Iterator[Dict[str, Any]]:
+        """
+        Stream the complete workflow.
+        
+        Forwards every agent's stream events tagged with their "stage"
+        (business_analysis, risk_detection, legal_retrieval, checklist) and ends
+        with {"stage": "done", "type": "result", "data": ...} matching
+        analyze_business. Cached risk and legal stages, and stages coalesced with an
+        identical in-flight run, emit only their result. With refresh=True every
+        stage is recomputed as in analyze_business(refresh=True).
+        """
+        tracer = get_tracer()
+
+        def run_stage(stage: str, events: Iterator[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+            # Timed by hand: a span context would leak into the consumer across yields
+            started = time.time()
+            for event in events:
+                yield {"stage": stage, **event}
+            tracer.record(f"stage.{stage}", started, time.time() - started, streaming=True)
+
+        def coalesced_stage(stage: str, key: str, events: Iterator[Dict[str, Any]], cache: bool = False) -> Iterator[Dict[str, Any]]:
+            # Keys match _cached_stage, so blocking and streaming runs share results and flights
+            result = self.stage_cache.get(key) if cache and not refresh else None
+            if result is not None:
+                yield {"stage": stage, "type": "result", "data": result}
+                return
+            flight_key = self._flight_key(key, refresh)
+            flight, leader = self.in_flight.claim(flight_key)
+            if not leader:
+                # An identical stage is already streaming elsewhere; share its result
+                yield {"stage": stage, "type": "result", "data": flight.wait()}
+                return
+            result = None
+            try:
+                for event in run_stage(stage, events):
+                    if event["type"] == "result":
+                        result = event["data"]
+                        if cache:
+                            self.stage_cache.set(key, result)
+                    yield event
+            except Exception as e:
+                self.in_flight.resolve(flight_key, flight, error=e)
+                raise
+            finally:
+                if not flight.done.is_set():
+                    # Finished normally, or the consumer stopped early
+                    self.in_flight.resolve(flight_key, flight, value=result,
+                                           error=None if result is not None else RuntimeError(f"{stage} stream was abandoned"))
+
+        results = {}
+        for event in coalesced_stage("business_analysis",
+                                     json.dumps(["business_analysis", description_key(business_description)]),
+                                     self.business_analyzer.analyze_stream(business_description, refresh=refresh)):
+            if event["type"] == "result":
+                results["business_analysis"] = event["data"]
+            yield event
+        domain = results["business_analysis"]["domain"]
+        geography = results["business_analysis"]["geography"]
+
+        for event in coalesced_stage("risk_detection", json.dumps(["risks", domain, geography]),
+                                     self.risk_detector.analyze_risks_stream(domain=domain, geography=geography, refresh=refresh),
+                                     cache=True):
+            if event["type"] == "result":
+                results["risk_analysis"] = event["data"]
+            yield event
+
+        query = f"{domain} compliance"
+        for event in coalesced_stage("legal_retrieval", json.dumps(["legal", query, geography]),
+                                     self.legal_retriever.retrieve_legal_info_stream(query=query, jurisdiction=geography, refresh=refresh),
+                                     cache=True):
+            if event["type"] == "result":
+                results["legal_info"] = event["data"]
+            yield event
+
+        checklist_key = self._checklist_key(domain, geography, results["risk_analysis"]["risks"], results["legal_info"]["sources"])
+        for event in coalesced_stage("checklist", checklist_key, self.checklist_generator.generate_checklist_stream(
+            domain=domain,
+            geography=geography,
+            stage="Early-stage",  # This could be made dynamic based on business description
+            risks=results["risk_analysis"]["risks"],
+            legal_docs=results["legal_info"]["sources"],
+            refresh=refresh
+        )):
+            if event["type"] == "result":
+                results["compliance_checklist"] = event["data"]
+            yield event
+
+        yield {"stage": "done", "type": "result", "data": results}
+
 # Example usage
 if __name__ == "__main__":
     # Initialize the workflow
@@ -1,7 +1,11 @@
 import streamlit as st
 import os
 from dotenv import load_dotenv
-from agents import BusinessModelAnalyzer, RiskDetectionAgent, LegalRetrieverAgent, ChecklistGeneratorAgent
+from agents import ComplianceWorkflow, ChecklistGeneratorAgent
+from service_client import submit_analysis, stream_job, fetch_trace
+from utils import ResultCache, SingleFlight, description_key
+from llm_cache import get_llm_cache
+from tracing import get_tracer
 import json
 import pandas as pd
 
@@ -15,11 +19,199 @@ st.set_page_config(
     layout="wide"
 )
 
-# Initialize agents
-business_analyzer = BusinessModelAnalyzer()
-risk_detector = RiskDetectionAgent()
-legal_retriever = LegalRetrieverAgent()
-checklist_generator = ChecklistGeneratorAgent()
+# Initialize the workflow once per process and share it across sessions and reruns
+@st.cache_resource
+def get_workflow():
+    return ComplianceWorkflow()
+
+def analysis_events(business_description, refresh=False):
+    """(API job id, workflow events): from the compliance API when COMPLIANCE_API_URL is set, otherwise in-process with no job id"""
+    api_url = os.getenv("COMPLIANCE_API_URL")
+    if api_url:
+        job_id = submit_analysis(api_url, business_description, refresh=refresh)
+        return job_id, stream_job(api_url, job_id)
+    return None, get_workflow().analyze_business_stream(business_description, refresh=refresh)
+
+@st.cache_resource
+def get_result_cache():
+    return ResultCache(
+        max_entries=int(os.getenv("RESULT_CACHE_MAX_ENTRIES", "128")),
+        ttl=float(os.getenv("RESULT_CACHE_TTL_SECONDS", "3600"))
+    )
+
+# Sessions submitting the same description at once share one analysis
+@st.cache_resource
+def get_in_flight():
+    return SingleFlight()
+
+def render_business_analysis(business_analysis):
+    st.subheader("🏢 Business Analysis")
+    st.markdown("""
+    **Domain:** {domain}  
+    **Geography:** {geography}  
+    **Operations:** {operations}  
+    **Target Market:** {target_market}
+    """.format(
+        domain=business_analysis['domain'],
+        geography=business_analysis['geography'],
+        operations=business_analysis.get('operations', 'Not specified'),
+        target_market=business_analysis.get('target_market', 'Not specified')
+    ))
+
+def render_risk_summary(risk_profile):
+    st.subheader("⚠️ Legal Risk Analysis")
+    st.markdown(f"**Risk Level:** {risk_profile['risk_level']}")
+    st.markdown(f"**Total Risks Identified:** {risk_profile['total_risks']}")
+
+    # Display risk categories
+    if risk_profile['risk_categories']:
+        st.markdown("**Key Risk Areas:** " + ", ".join(risk_profile['risk_categories']))
+    else:
+        st.markdown("**Key Risk Areas:** -- empty")
+
+    st.markdown("### Detailed Risk Analysis")
+
+def render_risk(risk):
+    with st.expander(f"🔍 {risk.get('risk_name', 'Unknown Risk')}"):
+        st.markdown(f"**Severity:** {risk.get('severity', 'Medium')}")
+        st.markdown(f"**Description:** {risk.get('description', 'No description available')}")
+        st.markdown(f"**Applicable Laws:** {risk.get('law_or_framework', 'Not specified')}")
+        st.markdown(f"**Status:** {risk.get('status', 'Pending')}")
+
+def render_legal_sources(legal_info):
+    st.markdown("**Legal Sources:**")
+    for source in legal_info['sources']:
+        with st.expander(f"📄 {source.get('source', 'Unknown Source')}"):
+            if 'summary' in source:
+                st.markdown("**Summary:**")
+                st.markdown(source['summary'])
+            if 'content' in source:
+                st.markdown("**Content Preview:**")
+                st.markdown(source['content'][:500] + "...")
+            if 'jurisdiction' in source:
+                st.markdown(f"**Jurisdiction:** {source['jurisdiction']}")
+            if 'type' in source:
+                st.markdown(f"**Document Type:** {source['type']}")
+
+def render_checklist_download(checklist):
+    checklist_json = json.dumps(checklist, indent=2)
+    st.download_button(
+        label="Download Checklist",
+        data=checklist_json,
+        file_name="compliance_checklist.json",
+        mime="application/json"
+    )
+
+def render_results(results):
+    """Render a complete, previously computed analysis"""
+    col1, col2 = st.columns(2)
+
+    with col1:
+        render_business_analysis(results["business_analysis"])
+        render_risk_summary(results["risk_profile"])
+        for risk in results["risk_profile"]['risks']:
+            render_risk(risk)
+
+    with col2:
+        st.subheader("📚 Legal Information")
+        st.markdown(results["legal_info"]['summary'])
+        render_legal_sources(results["legal_info"])
+
+    st.subheader("📋 Compliance Checklist")
+    st.markdown(results["checklist"]['checklist'])
+    render_checklist_download(results["checklist"])
+
+def stream_results(events):
+    """Render workflow events as they arrive and return the complete results"""
+    col1, col2 = st.columns(2)
+    with col1:
+        analysis_placeholder = st.empty()
+        analysis_placeholder.info("Analyzing business model...")
+        summary_placeholder = st.empty()
+        summary_placeholder.info("Analyzing legal and compliance risks...")
+        risks_container = st.container()
+    with col2:
+        st.subheader("📚 Legal Information")
+        legal_placeholder = st.empty()
+        legal_placeholder.info("Retrieving legal information...")
+        sources_container = st.container()
+    st.subheader("📋 Compliance Checklist")
+    checklist_placeholder = st.empty()
+    section_placeholders = {name: st.empty() for name in ChecklistGeneratorAgent.SECTIONS}
+    for placeholder in section_placeholders.values():
+        placeholder.info("Generating compliance checklist...")
+    download_container = st.container()
+
+    raw_analysis = ""
+    summary = ""
+    streamed_risks = 0
+    streamed_sections = 0
+    completed = set()
+    results = None
+
+    def finish_stage(stage, data):
+        # Cached stages (and cached API jobs) arrive as a bare result, so render everything here
+        completed.add(stage)
+        if stage == "business_analysis":
+            with analysis_placeholder.container():
+                render_business_analysis(data)
+        elif stage == "risk_detection":
+            with summary_placeholder.container():
+                render_risk_summary(data)
+            if not streamed_risks:
+                with risks_container:
+                    for risk in data['risks']:
+                        render_risk(risk)
+        elif stage == "legal_retrieval":
+            legal_placeholder.markdown(data['summary'])
+            with sources_container:
+                render_legal_sources(data)
+        elif stage == "checklist":
+            if not streamed_sections:
+                if data.get("sections"):
+                    for name, text in data["sections"].items():
+                        section_placeholders[name].markdown(f"## {name}\n\n{text}")
+                else:
+                    for placeholder in section_placeholders.values():
+                        placeholder.empty()
+                    checklist_placeholder.markdown(data['checklist'])
+            with download_container:
+                render_checklist_download(data)
+
+    for event in events:
+        stage, kind = event["stage"], event["type"]
+        if stage == "done":
+            results = event["data"]
+            for stage_name, key in [("business_analysis", "business_analysis"), ("risk_detection", "risk_analysis"),
+                                    ("legal_retrieval", "legal_info"), ("checklist", "compliance_checklist")]:
+                if stage_name not in completed:
+                    finish_stage(stage_name, results[key])
+        elif kind == "result":
+            finish_stage(stage, event["data"])
+        elif stage == "business_analysis" and kind == "token":
+            # Show the raw extraction while it streams
+            raw_analysis += event["text"]
+            analysis_placeholder.code(raw_analysis, language="json")
+        elif stage == "risk_detection" and kind == "risk":
+            streamed_risks += 1
+            with risks_container:
+                render_risk(event["risk"])
+        elif stage == "legal_retrieval" and kind == "token":
+            summary += event["text"]
+            legal_placeholder.markdown(summary)
+        elif stage == "checklist" and kind == "section":
+            streamed_sections += 1
+            section_placeholders[event["name"]].markdown(f"## {event['name']}\n\n{event['text']}")
+
+    if results is None:
+        # The stream closed (e.g. a dropped API connection) before the final event
+        raise RuntimeError("The analysis ended before all results were received. Please try again.")
+    return {
+        "business_analysis": results["business_analysis"],
+        "risk_profile": results["risk_analysis"],
+        "legal_info": results["legal_info"],
+        "checklist": results["compliance_checklist"]
+    }
 
 # Set up the Streamlit interface
 st.title("Legal & Compliance Risk Identifier")
@@ -33,100 +225,91 @@ business_description = st.text_area(
     height=150
 )
 
+# Drop the cached analysis for this description and recompute every stage,
+# bypassing the stage, LLM response and stored checklist caches
+refresh = st.button("🔄 Refresh analysis", disabled=not business_description)
+if refresh:
+    get_result_cache().invalidate(description_key(business_description))
+
 if business_description:
-    # Create columns for better layout
-    col1, col2 = st.columns(2)
-    
-    with col1:
-        # Analyze business model
-        with st.spinner("Analyzing business model..."):
-            business_analysis = business_analyzer.analyze(business_description)
-            st.subheader("🏢 Business Analysis")
-            st.markdown("""
-            **Domain:** {domain}  
-            **Geography:** {geography}  
-            **Operations:** {operations}  
-            **Target Market:** {target_market}
-            """.format(
-                domain=business_analysis['domain'],
-                geography=business_analysis['geography'],
-                operations=business_analysis.get('operations', 'Not specified'),
-                target_market=business_analysis.get('target_market', 'Not specified')
-            ))
-
-        # Analyze legal risks
-        with st.spinner("Analyzing legal and compliance risks..."):
-            risk_profile = risk_detector.analyze_risks(
-                business_analysis['domain'],
-                business_analysis['geography']
-            )
-            
-            # Display risk analysis
-            st.subheader("⚠️ Legal Risk Analysis")
-            st.markdown(f"**Risk Level:** {risk_profile['risk_level']}")
-            st.markdown(f"**Total Risks Identified:** {risk_profile['total_risks']}")
-            
-            # Display risk categories
-            if risk_profile['risk_categories']:
-                st.markdown("**Key Risk Areas:** " + ", ".join(risk_profile['risk_categories']))
-            else:
-                st.markdown("**Key Risk Areas:** -- empty")
-            
-            # Display detailed risk analysis
-            st.markdown("### Detailed Risk Analysis")
-            for risk in risk_profile['risks']:
-                with st.expander(f"🔍 {risk.get('risk_name', 'Unknown Risk')}"):
-                    st.markdown(f"**Severity:** {risk.get('severity', 'Medium')}")
-                    st.markdown(f"**Description:** {risk.get('description', 'No description available')}")
-                    st.markdown(f"**Applicable Laws:** {risk.get('law_or_framework', 'Not specified')}")
-                    st.markdown(f"**Status:** {risk.get('status', 'Pending')}")
+    # Serve cached results instantly, otherwise stream a fresh analysis and cache it
+    cache = get_result_cache()
+    key = description_key(business_description)
+    results = cache.get(key)
+    if results is not None:
+        render_results(results)
+    else:
+        in_flight = get_in_flight()
+        # A refresh must not wait for a run that may be serving cached stages
+        flight_key = f"refresh:{key}" if refresh else key
+        flight, leader = in_flight.claim(flight_key)
+        results = None
+        if not leader:
+            try:
+                with st.spinner("An identical analysis is already running, waiting for its results..."):
+                    results = flight.wait()
+            except Exception:
+                # The other session failed or was interrupted; run our own analysis below
+                flight, leader = in_flight.claim(flight_key)
+            if results is not None:
+                render_results(results)
+        if leader:
+            try:
+                job_id, events = analysis_events(business_description, refresh=refresh)
+                with get_tracer().trace("streamlit_analysis") as trace_id:
+                    results = stream_results(events)
+                cache.set(key, results)
+            except BaseException as e:
+                # Includes Streamlit's rerun/stop exceptions, so waiters are never stranded
+                in_flight.resolve(flight_key, flight, error=e)
+                raise
+            in_flight.resolve(flight_key, flight, value=results)
+            st.session_state["last_trace_id"] = trace_id
+            st.session_state["last_job_id"] = job_id
+        elif results is None:
+            render_results(flight.wait())
 
-    with col2:
-        # Retrieve legal information
-        with st.spinner("Retrieving legal information..."):
-            legal_info = legal_retriever.retrieve_legal_info(
-                business_analysis['domain'],
-                business_analysis['geography']
-            )
-            st.subheader("📚 Legal Information")
-            st.markdown(legal_info['summary'])
-            
-            st.markdown("**Legal Sources:**")
-            for source in legal_info['sources']:
-                with st.expander(f"📄 {source.get('source', 'Unknown Source')}"):
-                    if 'summary' in source:
-                        st.markdown("**Summary:**")
-                        st.markdown(source['summary'])
-                    if 'content' in source:
-                        st.markdown("**Content Preview:**")
-                        st.markdown(source['content'][:500] + "...")
-                    if 'jurisdiction' in source:
-                        st.markdown(f"**Jurisdiction:** {source['jurisdiction']}")
-                    if 'type' in source:
-                        st.markdown(f"**Document Type:** {source['type']}")
-
-    # Generate and display compliance checklist
-    with st.spinner("Generating compliance checklist..."):
-        checklist = checklist_generator.generate_checklist(
-            domain=business_analysis['domain'],
-            geography=business_analysis['geography'],
-            stage="Early-stage",  # This could be made dynamic based on business description
-            risks=risk_profile['risks'],
-            legal_docs=legal_info['sources']
-        )
-        
-        st.subheader("📋 Compliance Checklist")
-        st.markdown(checklist['checklist'])
-        
-        # Add download button for the checklist
-        checklist_json = json.dumps(checklist, indent=2)
-        st.download_button(
-            label="Download Checklist",
-            data=checklist_json,
-            file_name="compliance_checklist.json",
-            mime="application/json"
-        )
+def last_trace():
+    """(summary, spans) of the last analysis, fetched from the compliance API when it ran there"""
+    job_id = st.session_state.get("last_job_id")
+    if job_id:
+        trace = fetch_trace(os.getenv("COMPLIANCE_API_URL"), job_id)
+        return trace["summary"], trace["spans"]
+    tracer = get_tracer()
+    trace_id = st.session_state["last_trace_id"]
+    return tracer.summary(trace_id), tracer.spans(trace_id)
+
+# Debug panel: spans and per-stage latency of the last analysis in this session
+if st.session_state.get("last_trace_id"):
+    with st.expander("🐞 Debug: stage timings"):
+        try:
+            summary, spans = last_trace()
+        except Exception as e:
+            summary, spans = None, []
+            st.markdown(f"Could not fetch the trace from the compliance API: {str(e)}")
+        if summary:
+            st.markdown("**Per-stage summary**")
+            st.dataframe(pd.DataFrame.from_dict(summary, orient="index"))
+            st.markdown("**Spans**")
+            st.dataframe(pd.DataFrame([
+                {"name": span["name"], "duration_ms": span["duration_ms"], **span["attributes"]}
+                for span in spans
+            ]))
+        elif summary is not None:
+            st.markdown("No spans recorded for the last analysis (it may have been served from a cache or expired from the buffer).")
+
+# LLM response cache metrics
+llm_cache_stats = get_llm_cache().stats()
+st.sidebar.markdown("**LLM Cache**")
+st.sidebar.markdown(
+    f"Hits: {llm_cache_stats['hits']} · Misses: {llm_cache_stats['misses']} · "
+    f"Bypassed: {llm_cache_stats['bypassed']} · Entries: {llm_cache_stats['size']}"
+)
+coalesced = f"Coalesced analyses: {get_in_flight().coalesced}"
+if not os.getenv("COMPLIANCE_API_URL"):
+    coalesced += f" · Coalesced stages: {get_workflow().in_flight.coalesced}"
+st.sidebar.markdown(coalesced)
 
 # Footer
 st.markdown("---")
-st.markdown("Built with ❤️ using Streamlit, LangChain, and Google's Generative AI") 
\ No newline at end of file
+st.markdown("Built with ❤️ using Streamlit, LangChain, and Google's Generative AI")
@@ -0,0 +1,152 @@
+"""
+Batch compliance analysis over a JSONL or CSV file of business descriptions.
+
+Example:
+    python batch.py portfolio.jsonl --output results.jsonl --concurrency 4 --records-per-minute 30
+
+Each input record needs an id and a business description (see --id-field and
+--text-field). Results are appended to the output JSONL as soon as each record
+finishes, and records already present in the output are skipped, so an
+interrupted run can be resumed by running the same command again. Failed
+records are written to <output>.errors.jsonl and retried on the next run.
+"""
+import os
+import csv
+import json
+import time
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Dict, Any, Iterator, Set
+from agents import ComplianceWorkflow
+from rate_limiter import priority, BATCH
+
+class RecordPacer:
+    """Spaces out record starts so no more than `rate_per_minute` begin per minute.
+
+    Unlike rate_limiter.RateLimiter (per-model request and token quotas with
+    backoff), this only paces how fast batch records are started.
+    """
+
+    def __init__(self, rate_per_minute: float):
+        self.interval = 60.0 / rate_per_minute if rate_per_minute > 0 else 0.0
+        self._next_slot = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            wait_for = max(0.0, self._next_slot - now)
+            self._next_slot = max(now, self._next_slot) + self.interval
+        if wait_for:
+            time.sleep(wait_for)
+
+def read_records(path: str, id_field: str, text_field: str) -> Iterator[Dict[str, Any]]:
+    """Yield records lazily from a JSONL or CSV file"""
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        if path.lower().endswith(".csv"):
+            rows = csv.DictReader(f)
+        else:
+            rows = (json.loads(line) for line in f if line.strip())
+        for index, row in enumerate(rows):
+            # Only a missing id falls back to the row number; 0 and "" are real ids
+            record_id = row.get(id_field)
+            yield {
+                "id": str(index if record_id is None else record_id),
+                "business_description": row.get(text_field) or ""
+            }
+
+def completed_ids(output_path: str) -> Set[str]:
+    """Ids already written to the output, used as the resume checkpoint"""
+    done = set()
+    if os.path.exists(output_path):
+        with open(output_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    done.add(json.loads(line)["id"])
+                except (ValueError, KeyError):
+                    # A partially written last line from an interrupted run
+                    continue
+    return done
+
+def process_record(workflow: ComplianceWorkflow, limiter: RecordPacer, record: Dict[str, Any]) -> Dict[str, Any]:
+    limiter.acquire()
+    started = time.time()
+    # Batch work yields Gemini quota to interactive sessions in the same process
+    with priority(BATCH):
+        results = workflow.analyze_business(record["business_description"])
+    return {"id": record["id"], "elapsed_seconds": round(time.time() - started, 2), "results": results}
+
+def run_batch(input_path: str,
+              output_path: str,
+              concurrency: int = 4,
+              records_per_minute: float = 30,
+              id_field: str = "id",
+              text_field: str = "business_description") -> Dict[str, int]:
+    """Process every pending record, streaming results to output_path"""
+    done = completed_ids(output_path)
+    errors_path = f"{output_path}.errors.jsonl"
+    limiter = RecordPacer(records_per_minute)
+    # One workflow for the whole run so agents and stage caches are shared across records
+    workflow = ComplianceWorkflow()
+    counts = {"processed": 0, "skipped": 0, "failed": 0}
+
+    with open(output_path, "a", encoding="utf-8") as output, \
+            open(errors_path, "a", encoding="utf-8") as errors, \
+            ThreadPoolExecutor(max_workers=concurrency) as executor:
+        pending = {}
+
+        def drain(return_when):
+            finished, _ = wait(pending, return_when=return_when)
+            for future in finished:
+                record = pending.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    print(f"Error processing record {record['id']}: {str(e)}")
+                    errors.write(json.dumps({"id": record["id"], "error": str(e)}) + "\n")
+                    errors.flush()
+                    counts["failed"] += 1
+                    continue
+                output.write(json.dumps(result, default=str) + "\n")
+                output.flush()
+                counts["processed"] += 1
+                print(f"Processed {record['id']} in {result['elapsed_seconds']}s")
+
+        for record in read_records(input_path, id_field, text_field):
+            if record["id"] in done or not record["business_description"].strip():
+                counts["skipped"] += 1
+                continue
+            # Keep at most two records per worker in flight so large inputs stream
+            if len(pending) >= concurrency * 2:
+                drain(FIRST_COMPLETED)
+            pending[executor.submit(process_record, workflow, limiter, record)] = record
+        while pending:
+            drain(FIRST_COMPLETED)
+
+    return counts
+
+def main():
+    parser = argparse.ArgumentParser(description="Run compliance analysis over a JSONL/CSV file of businesses")
+    parser.add_argument("input", help="Input .jsonl or .csv file")
+    parser.add_argument("--output", default="batch_results.jsonl", help="Output JSONL file (also the resume checkpoint)")
+    parser.add_argument("--concurrency", type=int, default=4, help="Number of records processed in parallel")
+    parser.add_argument("--records-per-minute", type=float, default=30, help="Global cap on records started per minute (0 disables)")
+    parser.add_argument("--id-field", default="id", help="Record id field or column")
+    parser.add_argument("--text-field", default="business_description", help="Business description field or column")
+    args = parser.parse_args()
+
+    started = time.time()
+    counts = run_batch(
+        args.input,
+        args.output,
+        concurrency=args.concurrency,
+        records_per_minute=args.records_per_minute,
+        id_field=args.id_field,
+        text_field=args.text_field
+    )
+    print(f"Done in {time.time() - started:.1f}s: {counts['processed']} processed, "
+          f"{counts['skipped']} skipped, {counts['failed']} failed")
+
+if __name__ == "__main__":
+    main()
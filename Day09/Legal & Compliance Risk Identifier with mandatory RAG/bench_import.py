@@ -0,0 +1,134 @@
+"""
+Cold-start benchmark for the legal agents.
+
+Example:
+    python bench_import.py --runs 5 --max-import-seconds 1.5
+
+Each run starts a fresh interpreter, imports `agents` and constructs a
+ComplianceWorkflow, timing both steps. The slowest imports of the last run are
+listed (from `python -X importtime`). Every third-party package the run loaded
+is checked against EXPECTED_MODULES, and heavy client libraries must not be
+loaded at all. With --max-import-seconds, or when a heavy or unexpected package
+is loaded, the script exits non-zero so startup regressions fail CI. A new
+module-level dependency has to be added to EXPECTED_MODULES deliberately.
+"""
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+# Libraries that must only be imported when a client is first used
+HEAVY_MODULES = [
+    "langchain_community.vectorstores",
+    "chromadb",
+    "langchain_google_genai",
+    "google.generativeai",
+    "langchain.chains",
+    "langchain.agents",
+    "bs4",
+    "lxml",
+    "numpy"
+]
+
+# Third-party top-level packages that importing agents and constructing a
+# ComplianceWorkflow may load
+EXPECTED_MODULES = {
+    # Imported at module level by agents and its local modules
+    "dotenv", "pydantic", "pydantic_core", "langchain_core",
+    # pydantic's dependencies
+    "annotated_types", "typing_extensions", "typing_inspection",
+    # langchain_core's dependencies, including the langsmith client and its HTTP stack
+    "langsmith", "jsonpatch", "jsonpointer", "packaging", "yaml", "tenacity",
+    "orjson", "uuid_utils", "xxhash", "zstandard", "distro",
+    "requests", "requests_toolbelt", "urllib3", "charset_normalizer", "idna", "certifi", "socks",
+    "httpx", "httpx2", "httpcore", "h11", "anyio", "sniffio"
+}
+
+PROBE = """
+import os, sys, json, time
+started = time.perf_counter()
+import agents
+imported = time.perf_counter()
+agents.ComplianceWorkflow()
+constructed = time.perf_counter()
+here = os.getcwd()
+packages = set()
+for name, module in list(sys.modules.items()):
+    top = name.split(".")[0]
+    if top.startswith("_") or top in sys.stdlib_module_names or top == "cython_runtime":
+        continue
+    if (getattr(module, "__file__", None) or "").startswith(here):
+        # The project's own modules
+        continue
+    packages.add(top)
+print(json.dumps({
+    "import_seconds": imported - started,
+    "construct_seconds": constructed - imported,
+    "heavy_loaded": [name for name in %r if name in sys.modules],
+    "packages": sorted(packages)
+}))
+""" % (HEAVY_MODULES,)
+
+def run_probe(importtime: bool = False):
+    """Run the probe in a fresh interpreter; returns (parsed output, importtime stderr)"""
+    command = [sys.executable]
+    if importtime:
+        command += ["-X", "importtime"]
+    command += ["-c", PROBE]
+    result = subprocess.run(
+        command,
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        capture_output=True,
+        text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Probe failed:\n{result.stderr}")
+    return json.loads(result.stdout.strip().splitlines()[-1]), result.stderr
+
+def slowest_imports(importtime_output: str, top: int):
+    """Parse `-X importtime` output into the modules with the largest cumulative time"""
+    rows = []
+    for line in importtime_output.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        # Format: "import time:  <self us> | <cumulative us> | <indented module name>"
+        self_us, cumulative_us, name = line.split(":", 1)[1].split("|")
+        rows.append((int(cumulative_us), int(self_us), name.strip()))
+    return sorted(rows, reverse=True)[:top]
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure cold import and construction time of the legal agents")
+    parser.add_argument("--runs", type=int, default=5, help="Number of fresh-interpreter runs")
+    parser.add_argument("--top", type=int, default=15, help="Number of slowest imports to list")
+    parser.add_argument("--max-import-seconds", type=float, default=None, help="Fail if the median import time exceeds this")
+    args = parser.parse_args()
+
+    timings = [run_probe()[0] for _ in range(args.runs)]
+    last, importtime_output = run_probe(importtime=True)
+
+    imports = [t["import_seconds"] for t in timings]
+    constructs = [t["construct_seconds"] for t in timings]
+    print(f"import agents:        median {statistics.median(imports):.3f}s  max {max(imports):.3f}s")
+    print(f"ComplianceWorkflow(): median {statistics.median(constructs):.3f}s  max {max(constructs):.3f}s")
+
+    print(f"\n{'cumulative_ms':>14}{'self_ms':>10}  module")
+    for cumulative_us, self_us, name in slowest_imports(importtime_output, args.top):
+        print(f"{cumulative_us / 1000:>14.1f}{self_us / 1000:>10.1f}  {name}")
+
+    failed = False
+    if last["heavy_loaded"]:
+        print(f"\nHeavy modules loaded eagerly: {', '.join(last['heavy_loaded'])}")
+        failed = True
+    unexpected = sorted(set(last["packages"]) - EXPECTED_MODULES)
+    if unexpected:
+        print(f"\nUnexpected packages loaded (add them to EXPECTED_MODULES if intended): {', '.join(unexpected)}")
+        failed = True
+    if args.max_import_seconds is not None and statistics.median(imports) > args.max_import_seconds:
+        print(f"\nMedian import time exceeds {args.max_import_seconds:.3f}s")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,231 @@
+"""
+Maintenance for the agents' Chroma collections.
+
+Example:
+    python chroma_maintenance.py report
+    python chroma_maintenance.py dedup --dry-run
+    python chroma_maintenance.py expire --days 90 --collection compliance_checklists
+    python chroma_maintenance.py rebuild
+
+report  prints row counts and on-disk size per collection.
+dedup   deletes rows whose document and metadata (ignoring timestamps) repeat,
+        keeping the newest copy.
+expire  deletes rows whose `created_at` metadata is older than --days; rows
+        written before timestamps were recorded are kept unless --include-undated.
+rebuild copies each collection into a fresh one so the HNSW index no longer
+        carries deleted entries, then vacuums the SQLite store.
+
+Stop the app before running dedup, expire or rebuild against the same directory.
+"""
+import os
+import json
+import time
+import hashlib
+import sqlite3
+import argparse
+from typing import Dict, Any, List, Optional
+
+COLLECTIONS = ["business_analysis", "risk_profiles", "legal_documents", "compliance_checklists"]
+
+# Metadata that differs between otherwise identical rows
+TIMESTAMP_FIELDS = {"created_at", "generated_at"}
+
+def _client(path: str):
+    import chromadb
+    return chromadb.PersistentClient(path=path)
+
+def _directory_size(path: str) -> int:
+    total = 0
+    for root, _, names in os.walk(path):
+        for name in names:
+            total += os.path.getsize(os.path.join(root, name))
+    return total
+
+def _segment_dirs(path: str) -> Dict[str, List[str]]:
+    """Collection name -> on-disk segment directories, read from chroma.sqlite3"""
+    database = os.path.join(path, "chroma.sqlite3")
+    if not os.path.exists(database):
+        return {}
+    conn = sqlite3.connect(database)
+    try:
+        rows = conn.execute(
+            "SELECT collections.name, segments.id FROM segments JOIN collections ON segments.collection = collections.id"
+        ).fetchall()
+    except sqlite3.Error:
+        # Layout differs between Chroma versions; sizes are then reported as unknown
+        return {}
+    finally:
+        conn.close()
+    dirs = {}
+    for name, segment_id in rows:
+        segment_path = os.path.join(path, segment_id)
+        if os.path.isdir(segment_path):
+            dirs.setdefault(name, []).append(segment_path)
+    return dirs
+
+def _rows(collection, include: List[str], page_size: int = 1000) -> Dict[str, List[Any]]:
+    """Fetch every row of a collection in pages"""
+    rows = {"ids": []}
+    rows.update({field: [] for field in include})
+    offset = 0
+    while True:
+        page = collection.get(include=include, limit=page_size, offset=offset)
+        if not page["ids"]:
+            return rows
+        for field in rows:
+            rows[field].extend(page[field])
+        offset += len(page["ids"])
+
+def _delete(collection, ids: List[str], dry_run: bool, batch_size: int = 500) -> None:
+    if dry_run:
+        return
+    for offset in range(0, len(ids), batch_size):
+        collection.delete(ids=ids[offset:offset + batch_size])
+
+def _vacuum(path: str) -> None:
+    database = os.path.join(path, "chroma.sqlite3")
+    if os.path.exists(database):
+        conn = sqlite3.connect(database)
+        try:
+            conn.execute("VACUUM")
+        finally:
+            conn.close()
+
+def report(client, path: str, names: List[str]) -> List[Dict[str, Any]]:
+    segment_dirs = _segment_dirs(path)
+    rows = []
+    for name in names:
+        try:
+            count = client.get_collection(name).count()
+        except Exception:
+            count = None
+        dirs = segment_dirs.get(name)
+        rows.append({
+            "collection": name,
+            "rows": count,
+            "index_bytes": sum(_directory_size(d) for d in dirs) if dirs is not None else None
+        })
+    database = os.path.join(path, "chroma.sqlite3")
+    rows.append({
+        "collection": "(shared sqlite)",
+        "rows": None,
+        "index_bytes": os.path.getsize(database) if os.path.exists(database) else None
+    })
+    return rows
+
+def dedup(client, name: str, dry_run: bool = False) -> int:
+    """Delete repeated rows, keeping the most recently created copy"""
+    collection = client.get_collection(name)
+    rows = _rows(collection, ["documents", "metadatas"])
+    keep = {}
+    duplicates = []
+    for row_id, document, metadata in zip(rows["ids"], rows["documents"], rows["metadatas"]):
+        metadata = metadata or {}
+        content = {key: value for key, value in metadata.items() if key not in TIMESTAMP_FIELDS}
+        key = hashlib.sha256(json.dumps([document, content], sort_keys=True, default=str).encode("utf-8")).hexdigest()
+        created_at = metadata.get("created_at") or 0
+        if key in keep:
+            kept_id, kept_created_at = keep[key]
+            if created_at > kept_created_at:
+                duplicates.append(kept_id)
+                keep[key] = (row_id, created_at)
+            else:
+                duplicates.append(row_id)
+        else:
+            keep[key] = (row_id, created_at)
+    _delete(collection, duplicates, dry_run)
+    return len(duplicates)
+
+def expire(client, name: str, days: float, include_undated: bool = False, dry_run: bool = False) -> int:
+    """Delete rows whose created_at is older than `days`"""
+    collection = client.get_collection(name)
+    cutoff = time.time() - days * 24 * 3600
+    rows = _rows(collection, ["metadatas"])
+    expired = []
+    for row_id, metadata in zip(rows["ids"], rows["metadatas"]):
+        created_at = (metadata or {}).get("created_at")
+        if created_at is None:
+            if include_undated:
+                expired.append(row_id)
+        elif created_at < cutoff:
+            expired.append(row_id)
+    _delete(collection, expired, dry_run)
+    return len(expired)
+
+def rebuild(client, name: str, backup_dir: str, batch_size: int = 500) -> int:
+    """Recreate a collection from its rows so the HNSW index is rebuilt without tombstones"""
+    collection = client.get_collection(name)
+    rows = _rows(collection, ["documents", "metadatas", "embeddings"])
+    # Keep a copy on disk until the new collection is fully written
+    os.makedirs(backup_dir, exist_ok=True)
+    backup_path = os.path.join(backup_dir, f"{name}.{int(time.time())}.jsonl")
+    with open(backup_path, "w", encoding="utf-8") as f:
+        for row_id, document, metadata, embedding in zip(rows["ids"], rows["documents"], rows["metadatas"], rows["embeddings"]):
+            f.write(json.dumps({"id": row_id, "document": document, "metadata": metadata, "embedding": list(map(float, embedding))}) + "\n")
+
+    collection_metadata = collection.metadata
+    client.delete_collection(name)
+    fresh = client.create_collection(name, metadata=collection_metadata)
+    for offset in range(0, len(rows["ids"]), batch_size):
+        end = offset + batch_size
+        fresh.add(
+            ids=rows["ids"][offset:end],
+            documents=rows["documents"][offset:end],
+            metadatas=rows["metadatas"][offset:end],
+            embeddings=[list(map(float, embedding)) for embedding in rows["embeddings"][offset:end]]
+        )
+    os.remove(backup_path)
+    return len(rows["ids"])
+
+def _format_bytes(size: Optional[int]) -> str:
+    if size is None:
+        return "n/a"
+    for unit in ["B", "KB", "MB"]:
+        if size < 1024:
+            return f"{size:.0f}{unit}" if unit == "B" else f"{size:.1f}{unit}"
+        size /= 1024
+    return f"{size:.1f}GB"
+
+def main():
+    parser = argparse.ArgumentParser(description="Report on and compact the agents' Chroma collections")
+    parser.add_argument("command", choices=["report", "dedup", "expire", "rebuild"])
+    parser.add_argument("--path", default="./chroma_db", help="Chroma persist directory")
+    parser.add_argument("--collection", action="append", default=[], help="Collection to process (repeatable, default: all four)")
+    parser.add_argument("--days", type=float, default=90, help="expire: maximum age in days")
+    parser.add_argument("--include-undated", action="store_true", help="expire: also delete rows without created_at")
+    parser.add_argument("--backup-dir", default="./chroma_backups", help="rebuild: where collection copies are kept while rebuilding")
+    parser.add_argument("--dry-run", action="store_true", help="dedup/expire: only count what would be deleted")
+    args = parser.parse_args()
+    if args.dry_run and args.command == "rebuild":
+        parser.error("--dry-run is not supported by rebuild; use report to inspect collections first")
+
+    client = _client(args.path)
+    names = args.collection or COLLECTIONS
+
+    if args.command == "report":
+        print(f"{'collection':<24}{'rows':>10}{'index size':>14}")
+        for row in report(client, args.path, names):
+            rows = "" if row["rows"] is None else row["rows"]
+            print(f"{row['collection']:<24}{rows:>10}{_format_bytes(row['index_bytes']):>14}")
+        print(f"{'total on disk':<24}{'':>10}{_format_bytes(_directory_size(args.path)):>14}")
+        return
+
+    for name in names:
+        try:
+            if args.command == "dedup":
+                count = dedup(client, name, dry_run=args.dry_run)
+                print(f"{name}: {count} duplicate rows {'found' if args.dry_run else 'deleted'}")
+            elif args.command == "expire":
+                count = expire(client, name, args.days, include_undated=args.include_undated, dry_run=args.dry_run)
+                print(f"{name}: {count} rows older than {args.days:g} days {'found' if args.dry_run else 'deleted'}")
+            else:
+                count = rebuild(client, name, args.backup_dir)
+                print(f"{name}: rebuilt with {count} rows")
+        except Exception as e:
+            # e.g. a collection that has never been created in this directory
+            print(f"{name}: skipped ({str(e)})")
+    if not args.dry_run:
+        _vacuum(args.path)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+Lazily created Gemini and Chroma clients shared by the agents and the
+regulatory index build.
+"""
+import os
+from utils import locked_cached_property
+from rate_limiter import RateLimitedEmbeddings
+from tracing import TracedProxy
+from endpoints import google_client_options
+
+class LazyClients:
+    """Create the Gemini LLM, embeddings and Chroma collection on first use.
+
+    Subclasses set `collection_name` and `temperature`. Nothing is imported,
+    opened or authenticated until an agent actually needs the client, and
+    concurrent first uses share one client.
+    """
+    collection_name: str = None
+    temperature: float = 0.7
+
+    @locked_cached_property
+    def llm(self):
+        from langchain_google_genai import ChatGoogleGenerativeAI
+        return ChatGoogleGenerativeAI(
+            model="gemini-1.5-flash",
+            google_api_key=os.getenv("GOOGLE_API_KEY"),
+            temperature=self.temperature,
+            convert_system_message_to_human=True,
+            **google_client_options()
+        )
+
+    @locked_cached_property
+    def embeddings(self):
+        from langchain_google_genai import GoogleGenerativeAIEmbeddings
+        return RateLimitedEmbeddings(
+            GoogleGenerativeAIEmbeddings(
+                model="models/embedding-001",
+                google_api_key=os.getenv("GOOGLE_API_KEY"),
+                **google_client_options()
+            ),
+            "models/embedding-001"
+        )
+
+    @locked_cached_property
+    def vector_db(self):
+        from langchain_community.vectorstores import Chroma
+        return TracedProxy(
+            Chroma(
+                persist_directory=os.getenv("CHROMA_DIR", "./chroma_db"),
+                embedding_function=self.embeddings,
+                collection_name=self.collection_name
+            ),
+            "chroma",
+            collection=self.collection_name
+        )
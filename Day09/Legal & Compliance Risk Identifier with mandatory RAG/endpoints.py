@@ -0,0 +1,31 @@
+"""
+Endpoint configuration for the external services the agents call.
+
+Setting LEGAL_STANDIN_URL (e.g. http://127.0.0.1:8765, see standin_server.py)
+routes every Gemini, Hugging Face and legal/government request to a local
+stand-in server, so the whole pipeline can run offline for load tests.
+"""
+import os
+from typing import Dict, Any, Optional
+from urllib.parse import urlsplit
+
+def standin_url() -> Optional[str]:
+    url = os.getenv("LEGAL_STANDIN_URL", "").strip().rstrip("/")
+    return url or None
+
+def google_client_options() -> Dict[str, Any]:
+    """Extra keyword arguments for the Gemini clients (LangChain wrappers and genai.configure)"""
+    url = standin_url()
+    if not url:
+        return {}
+    # The REST transport accepts plain-http endpoints; gRPC would need TLS
+    return {"transport": "rest", "client_options": {"api_endpoint": url}}
+
+def external_url(url: str) -> str:
+    """Rewrite https://host/path to <stand-in>/ext/host/path when a stand-in is configured"""
+    base = standin_url()
+    if not base:
+        return url
+    parts = urlsplit(url)
+    rewritten = f"{base}/ext/{parts.netloc}{parts.path}"
+    return f"{rewritten}?{parts.query}" if parts.query else rewritten
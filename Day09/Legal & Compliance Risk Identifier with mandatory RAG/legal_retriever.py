@@ -1,10 +1,15 @@
 import os
+import time
+import hashlib
+import argparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import Dict, List, Any, Optional
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain.prompts import ChatPromptTemplate
-from langchain.chains import LLMChain
 from pydantic import BaseModel, Field
-from utils import VectorStore
+from utils import VectorStore, ContextBuilder, ResultCache
+from llm_cache import cached_chain_run
+from dotenv import load_dotenv
 
 class LegalDocument(BaseModel):
     """Schema for legal documents"""
@@ -17,6 +22,12 @@ class LegalDocument(BaseModel):
 class LegalRetrieverAgent:
     def __init__(self, vector_store: VectorStore):
         self.vector_store = vector_store
+        self.context_builder = ContextBuilder(max_tokens=3000, max_passage_tokens=600)
+        # Templated queries repeat constantly: memoize retrieval per store version
+        # and analyses per (context, query); both are dropped when the store changes
+        self._retrieval_cache = ResultCache(max_entries=256, ttl=0)
+        self._analysis_cache = ResultCache(max_entries=256, ttl=0)
+        self._cached_store_version = vector_store.version
         self.llm = ChatGoogleGenerativeAI(
             model="gemini-1.5-flash",
             google_api_key=os.getenv("GOOGLE_API_KEY"),
@@ -29,22 +40,26 @@ class LegalRetrieverAgent:
             "gdpr": {
                 "title": "General Data Protection Regulation (GDPR)",
                 "type": "regulation",
-                "jurisdiction": "EU"
+                "jurisdiction": "EU",
+                "version": "1"
             },
             "hipaa": {
                 "title": "Health Insurance Portability and Accountability Act (HIPAA)",
                 "type": "regulation",
-                "jurisdiction": "US"
+                "jurisdiction": "US",
+                "version": "1"
             },
             "ccpa": {
                 "title": "California Consumer Privacy Act (CCPA)",
                 "type": "regulation",
-                "jurisdiction": "California"
+                "jurisdiction": "California",
+                "version": "1"
             },
             "yc_playbooks": {
                 "title": "Y Combinator Legal Playbook",
                 "type": "playbook",
-                "jurisdiction": "Global"
+                "jurisdiction": "Global",
+                "version": "1"
             }
         }
         
@@ -90,8 +105,9 @@ class LegalRetrieverAgent:
     def generate_legal_document(self, source_info: Dict[str, str]) -> Dict[str, Any]:
         """Generate legal document content using LLM"""
         try:
-            chain = LLMChain(llm=self.llm, prompt=self.legal_doc_prompt)
-            content = chain.run(
+            content = cached_chain_run(
+                self.llm,
+                self.legal_doc_prompt,
                 title=source_info["title"],
                 type=source_info["type"],
                 jurisdiction=source_info["jurisdiction"]
@@ -108,37 +124,97 @@ class LegalRetrieverAgent:
             print(f"Error generating document for {source_info['title']}: {str(e)}")
             return None
 
-    def collect_legal_documents(self) -> None:
-        """Collect and process legal documents from all sources"""
+    def collect_legal_documents(self, refresh: Optional[List[str]] = None, max_workers: int = 4) -> Dict[str, Dict[str, Any]]:
+        """Generate and store missing source documents concurrently.
+
+        Sources already stored at their configured version are skipped unless
+        listed in `refresh` ("all" refreshes every source). Returns a per-source
+        report with status and timings.
+        """
+        refresh = set(refresh or [])
+        if "all" in refresh:
+            refresh = set(self.data_sources)
+        unknown = refresh - set(self.data_sources)
+        if unknown:
+            raise ValueError(f"Unknown source(s): {', '.join(sorted(unknown))}")
+
+        report = {}
+        pending = {}
         for source_name, source_info in self.data_sources.items():
-            print(f"Generating document for {source_name}...")
-            
-            # Generate document content using LLM
-            document = self.generate_legal_document(source_info)
-            if not document:
+            if source_name not in refresh and self.vector_store.has_legal_document(source_name, source_info["version"]):
+                report[source_name] = {"status": "skipped"}
                 continue
-                
-            # Store in vector store
-            self.vector_store.add_legal_document(
-                document["content"],
-                {
-                    "source": document["source"],
-                    "type": document["type"],
-                    "jurisdiction": document["jurisdiction"],
-                    "title": document["title"]
+            pending[source_name] = source_info
+
+        def generate(source_name: str, source_info: Dict[str, str]):
+            started = time.time()
+            return self.generate_legal_document(source_info), time.time() - started
+
+        # Generation is the slow, network-bound part; storing stays on this thread
+        # because the VectorStore is not safe for concurrent writes
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(pending) or 1))) as executor:
+            futures = {
+                executor.submit(generate, source_name, source_info): source_name
+                for source_name, source_info in pending.items()
+            }
+            for future in as_completed(futures):
+                source_name = futures[future]
+                source_info = pending[source_name]
+                document, generate_seconds = future.result()
+                if not document:
+                    report[source_name] = {"status": "failed", "generate_seconds": round(generate_seconds, 2)}
+                    continue
+
+                started = time.time()
+                # Replace any older version of this source
+                self.vector_store.remove_legal_documents(source_name)
+                self.vector_store.add_legal_document(
+                    document["content"],
+                    {
+                        "source": document["source"],
+                        "type": document["type"],
+                        "jurisdiction": document["jurisdiction"],
+                        "title": document["title"],
+                        "source_key": source_name,
+                        "version": source_info["version"]
+                    }
+                )
+                report[source_name] = {
+                    "status": "generated",
+                    "generate_seconds": round(generate_seconds, 2),
+                    "store_seconds": round(time.time() - started, 2)
                 }
-            )
-            
-            print(f"Successfully generated and stored document for {source_name}")
+                print(f"Successfully generated and stored document for {source_name}")
+
+        return report
+
+    @staticmethod
+    def _memo_key(*parts: Any) -> str:
+        return hashlib.sha256("\x1f".join(str(part) for part in parts).encode("utf-8")).hexdigest()
+
+    def _check_store_version(self) -> int:
+        """Clear both memo levels if the vector store changed since they were filled"""
+        version = self.vector_store.version
+        if version != self._cached_store_version:
+            self._retrieval_cache.clear()
+            self._analysis_cache.clear()
+            self._cached_store_version = version
+        return version
 
     def retrieve_relevant_documents(self, query: str, jurisdiction: Optional[str] = None) -> List[Dict[str, Any]]:
         """Retrieve relevant legal documents using RAG"""
+        key = self._memo_key(query, jurisdiction, self._check_store_version())
+        results = self._retrieval_cache.get(key)
+        if results is not None:
+            return results
+
         # Search vector store
         results = self.vector_store.search_legal_documents(
             query,
             jurisdiction=jurisdiction
         )
         
+        self._retrieval_cache.set(key, results)
         return results
 
     def analyze_legal_requirements(self, query: str, jurisdiction: Optional[str] = None) -> Dict[str, Any]:
@@ -152,22 +228,28 @@ class LegalRetrieverAgent:
                 "message": "No relevant legal documents found"
             }
         
-        # Prepare context from retrieved documents
-        context = "\n\n".join([
-            f"Source: {doc['metadata']['source']}\n"
-            f"Jurisdiction: {doc['metadata']['jurisdiction']}\n"
-            f"Content: {doc['content']}"
-            for doc in relevant_docs
-        ])
+        # Prepare context from retrieved documents within the prompt budget
+        context = self.context_builder.build(query, [{
+            "text": doc['content'],
+            "source": doc['metadata']['source'],
+            "score": doc['similarity'],
+            "header": f"Source: {doc['metadata']['source']}\n"
+                      f"Jurisdiction: {doc['metadata']['jurisdiction']}\n"
+                      f"Content: "
+        } for doc in relevant_docs])
         
-        # Generate analysis using LLM
-        chain = LLMChain(llm=self.llm, prompt=self.rag_prompt)
-        analysis = chain.run(context=context, query=query)
+        # Generate analysis using LLM, reusing it when the same context answers the same query
+        key = self._memo_key(hashlib.sha256(context["context"].encode("utf-8")).hexdigest(), query)
+        analysis = self._analysis_cache.get(key)
+        if analysis is None:
+            analysis = cached_chain_run(self.llm, self.rag_prompt, context=context["context"], query=query)
+            self._analysis_cache.set(key, analysis)
         
         return {
             "status": "success",
             "analysis": analysis,
-            "sources": [doc["metadata"]["source"] for doc in relevant_docs]
+            "sources": [doc["metadata"]["source"] for doc in relevant_docs],
+            "context_sources": context["sources"]
         }
 
     def get_compliance_guidelines(self, domain: str, jurisdiction: str) -> Dict[str, Any]:
@@ -178,4 +260,24 @@ class LegalRetrieverAgent:
     def get_startup_legal_playbook(self, domain: str) -> Dict[str, Any]:
         """Get startup legal playbook for specific domain"""
         query = f"Startup legal requirements and best practices for {domain}"
-        return self.analyze_legal_requirements(query) 
\ No newline at end of file
+        return self.analyze_legal_requirements(query) 
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the legal document corpus in the vector store")
+    parser.add_argument("--refresh", action="append", default=[], metavar="SOURCE",
+                        help="Regenerate a source even if it is already stored (repeatable, or 'all')")
+    parser.add_argument("--workers", type=int, default=4, help="Number of sources generated in parallel")
+    parser.add_argument("--store-path", default="vector_store", help="Vector store path (without .json)")
+    args = parser.parse_args()
+
+    load_dotenv()
+    agent = LegalRetrieverAgent(VectorStore(args.store_path))
+    started = time.time()
+    report = agent.collect_legal_documents(refresh=args.refresh, max_workers=args.workers)
+    print(f"{'source':<16}{'status':<12}{'generate_s':>12}{'store_s':>10}")
+    for source_name, entry in report.items():
+        print(f"{source_name:<16}{entry['status']:<12}{entry.get('generate_seconds', ''):>12}{entry.get('store_seconds', ''):>10}")
+    print(f"Done in {time.time() - started:.1f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,237 @@
+import os
+import time
+import hashlib
+import sqlite3
+import threading
+from typing import Dict, Any, Iterator, Optional
+from rate_limiter import get_rate_limiter, is_rate_limit_error
+from tracing import get_tracer
+
+class LLMCache:
+    """Persistent SQLite cache of LLM responses keyed by (model, temperature, prompt hash)"""
+
+    def __init__(self,
+                 path: str = "llm_cache.sqlite3",
+                 max_entries: int = 5000,
+                 ttl: float = 7 * 24 * 3600,
+                 allow_nonzero_temperature: bool = False):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.allow_nonzero_temperature = allow_nonzero_temperature
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS llm_cache (
+                key TEXT PRIMARY KEY,
+                model TEXT,
+                temperature REAL,
+                response TEXT,
+                created_at REAL,
+                last_used REAL
+            )"""
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(model: str, temperature: Optional[float], prompt: str) -> str:
+        prompt_hash = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+        return hashlib.sha256(f"{model}|{temperature}|{prompt_hash}".encode("utf-8")).hexdigest()
+
+    def is_cacheable(self, temperature: Optional[float]) -> bool:
+        """Sampling at temperature > 0 is non-deterministic, so skip it unless allowed"""
+        return not temperature or self.allow_nonzero_temperature
+
+    def get(self, model: str, temperature: Optional[float], prompt: str) -> Optional[str]:
+        """Return a cached response, or None on miss, expiry or bypass"""
+        if not self.is_cacheable(temperature):
+            with self._lock:
+                self.bypassed += 1
+            return None
+
+        key = self.make_key(model, temperature, prompt)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, created_at FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and self.ttl and now - row[1] > self.ttl:
+                self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                self._conn.commit()
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE llm_cache SET last_used = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+            return row[0]
+
+    def set(self, model: str, temperature: Optional[float], prompt: str, response: str) -> None:
+        """Store a response and evict the least recently used entries past the size cap"""
+        if not self.is_cacheable(temperature):
+            return
+
+        key = self.make_key(model, temperature, prompt)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache VALUES (?, ?, ?, ?, ?, ?)",
+                (key, model, temperature, response, now, now)
+            )
+            if self.ttl:
+                self._conn.execute("DELETE FROM llm_cache WHERE created_at < ?", (now - self.ttl,))
+            self._conn.execute(
+                """DELETE FROM llm_cache WHERE key IN (
+                    SELECT key FROM llm_cache ORDER BY last_used DESC LIMIT -1 OFFSET ?
+                )""",
+                (self.max_entries,)
+            )
+            self._conn.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_cache")
+            self._conn.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss metrics for this process plus the current cache size"""
+        with self._lock:
+            size = self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "bypassed": self.bypassed,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "size": size
+        }
+
+_llm_cache = None
+_llm_cache_lock = threading.Lock()
+
+def get_llm_cache() -> LLMCache:
+    """Process-wide LLM cache configured from the environment"""
+    global _llm_cache
+    with _llm_cache_lock:
+        if _llm_cache is None:
+            _llm_cache = LLMCache(
+                path=os.getenv("LLM_CACHE_PATH", "llm_cache.sqlite3"),
+                max_entries=int(os.getenv("LLM_CACHE_MAX_ENTRIES", "5000")),
+                ttl=float(os.getenv("LLM_CACHE_TTL_SECONDS", str(7 * 24 * 3600))),
+                allow_nonzero_temperature=os.getenv("LLM_CACHE_ALLOW_NONZERO_TEMPERATURE", "false").lower() == "true"
+            )
+        return _llm_cache
+
+def _token_counts(message, rendered: str, response: str) -> Dict[str, Any]:
+    """Prompt/completion tokens from the response's usage_metadata, estimated from text length if absent"""
+    usage = getattr(message, "usage_metadata", None)
+    if usage:
+        return {
+            "prompt_tokens": usage.get("input_tokens"),
+            "completion_tokens": usage.get("output_tokens"),
+            "token_counts": "reported"
+        }
+    return {
+        "prompt_tokens": len(rendered) // 4,
+        "completion_tokens": len(response) // 4,
+        "token_counts": "estimated"
+    }
+
+def _run_limited(llm, prompt, rendered: str, inputs: Dict[str, Any]) -> str:
+    """Run prompt | llm through the shared Gemini rate limiter"""
+    model = getattr(llm, "model", "unknown")
+    with get_tracer().span("llm", model=model) as span:
+        # The limiter reserves quota up front, so it can only use the estimate
+        message = get_rate_limiter().call(
+            model,
+            (prompt | llm).invoke,
+            inputs,
+            tokens=len(rendered) // 4
+        )
+        response = message.content if hasattr(message, "content") else str(message)
+        span.update(_token_counts(message, rendered, response))
+    return response
+
+def cached_chain_run(llm, prompt, *, refresh: bool = False, **inputs) -> str:
+    """Run prompt | llm, serving byte-identical rendered prompts from the cache.
+
+    With refresh=True the cached response is ignored and replaced by a fresh one.
+    """
+    rendered = prompt.format(**inputs)
+    if os.getenv("LLM_CACHE_ENABLED", "true").lower() != "true":
+        return _run_limited(llm, prompt, rendered, inputs)
+
+    cache = get_llm_cache()
+    model = getattr(llm, "model", "unknown")
+    temperature = getattr(llm, "temperature", None)
+
+    response = None if refresh else cache.get(model, temperature, rendered)
+    if response is not None:
+        get_tracer().record("llm_cache_hit", time.time(), 0, model=model)
+        return response
+
+    response = _run_limited(llm, prompt, rendered, inputs)
+    cache.set(model, temperature, rendered, response)
+    return response
+
+def cached_chain_stream(llm, prompt, *, refresh: bool = False, **inputs) -> Iterator[str]:
+    """Stream LLM output chunks, replaying cached responses as a single chunk.
+
+    With refresh=True the cached response is ignored and replaced by a fresh one.
+    """
+    caching = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+    cache = get_llm_cache() if caching else None
+    model = getattr(llm, "model", "unknown")
+    temperature = getattr(llm, "temperature", None)
+    rendered = prompt.format(**inputs)
+
+    if cache is not None and not refresh:
+        response = cache.get(model, temperature, rendered)
+        if response is not None:
+            get_tracer().record("llm_cache_hit", time.time(), 0, model=model)
+            yield response
+            return
+
+    # Quota errors can only be retried before the first chunk has been yielded
+    limiter = get_rate_limiter()
+    retries = 3
+    parts = []
+    # Chunks are summed so usage_metadata reported across chunks adds up
+    # Timed by hand because a span context would leak into the caller across yields
+    started = time.time()
+    first_token_at = None
+    for attempt in range(retries + 1):
+        limiter.acquire(model, tokens=len(rendered) // 4)
+        message = None
+        try:
+            for chunk in (prompt | llm).stream(inputs):
+                if hasattr(chunk, "usage_metadata"):
+                    message = chunk if message is None else message + chunk
+                text = chunk.content if hasattr(chunk, "content") else str(chunk)
+                if text:
+                    first_token_at = first_token_at or time.time()
+                    parts.append(text)
+                    yield text
+        except Exception as e:
+            if parts or not is_rate_limit_error(e) or attempt == retries:
+                raise
+            limiter.report_rate_limited(model)
+            continue
+        limiter.report_success(model)
+        break
+    get_tracer().record(
+        "llm",
+        started,
+        time.time() - started,
+        model=model,
+        streaming=True,
+        time_to_first_token_ms=round((first_token_at - started) * 1000, 2) if first_token_at else None,
+        **_token_counts(message, rendered, "".join(parts))
+    )
+
+    if cache is not None:
+        cache.set(model, temperature, rendered, "".join(parts))
@@ -0,0 +1,128 @@
+"""
+Load driver for the compliance pipeline.
+
+Example (fully offline, starts the stand-in in-process):
+    python load_test.py --standin --sessions 8 --requests 80 --latency llm=lognormal:800:0.5
+
+Example (against an already running stand-in or real services):
+    LEGAL_STANDIN_URL=http://127.0.0.1:8765 python load_test.py --sessions 4 --requests 20
+
+N concurrent sessions run ComplianceWorkflow.analyze_business until the request
+count is reached. The report shows throughput, end-to-end latency percentiles,
+errors and the per-stage p50/p95 from the tracer. With --cold every request
+gets a fresh workflow and the LLM response cache is disabled, so each request
+exercises every stage; otherwise stage and response caches behave as in the app.
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from standin_server import StandinServer, add_config_arguments, config_from_args
+
+SAMPLE_DESCRIPTIONS = [
+    "We are a healthtech startup building a remote patient monitoring app for hospitals in California and the EU.",
+    "A fintech platform offering small business lending and payment processing across the United States.",
+    "An e-commerce marketplace connecting independent retailers with shoppers in the UK and Europe.",
+    "An edtech company providing online learning tools to schools and students in India.",
+    "A B2B SaaS platform that stores customer support conversations for companies in the United States and EU."
+]
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, int(round(pct / 100 * (len(ordered) - 1)))))]
+
+def configure_offline_environment(scratch_dir: str) -> None:
+    """Keep load-test state out of the app's stores and lift client-side limits"""
+    os.environ.setdefault("GOOGLE_API_KEY", "standin")
+    os.environ.setdefault("CHROMA_DIR", os.path.join(scratch_dir, "chroma_db"))
+    os.environ.setdefault("LLM_CACHE_PATH", os.path.join(scratch_dir, "llm_cache.sqlite3"))
+    # The stand-in enforces no quota; the driver should measure the pipeline, not the limiter
+    os.environ.setdefault("LLM_REQUESTS_PER_MINUTE", "1000000")
+    os.environ.setdefault("LLM_TOKENS_PER_MINUTE", "1000000000")
+    os.environ.setdefault("EMBEDDING_REQUESTS_PER_MINUTE", "1000000")
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure throughput and tail latency of the compliance pipeline")
+    parser.add_argument("--sessions", type=int, default=4, help="Concurrent sessions")
+    parser.add_argument("--requests", type=int, default=20, help="Total analyses to run")
+    parser.add_argument("--warmup", type=int, default=1, help="Analyses run before measuring")
+    parser.add_argument("--cold", action="store_true", help="Fresh workflow per request and no LLM response cache")
+    parser.add_argument("--standin", action="store_true", help="Start the stand-in server in-process and route all calls to it")
+    add_config_arguments(parser)
+    args = parser.parse_args()
+
+    scratch_dir = tempfile.mkdtemp(prefix="legal_load_test_")
+    server = None
+    if args.standin:
+        server = StandinServer(config_from_args(args))
+        os.environ["LEGAL_STANDIN_URL"] = server.start()
+        configure_offline_environment(scratch_dir)
+        print(f"Stand-in running at {server.url}; scratch data in {scratch_dir}")
+    if args.cold:
+        os.environ["LLM_CACHE_ENABLED"] = "false"
+
+    # Imported after the environment is configured so clients pick it up
+    from agents import ComplianceWorkflow
+    from tracing import get_tracer, summarize_spans
+
+    shared = None if args.cold else ComplianceWorkflow()
+    counter = iter(range(args.warmup + args.requests))
+    counter_lock = threading.Lock()
+
+    def run_one():
+        with counter_lock:
+            index = next(counter)
+        description = SAMPLE_DESCRIPTIONS[index % len(SAMPLE_DESCRIPTIONS)]
+        workflow = shared or ComplianceWorkflow()
+        started = time.perf_counter()
+        with get_tracer().trace("load_test") as trace_id:
+            workflow.analyze_business(description)
+        return time.perf_counter() - started, trace_id
+
+    for _ in range(args.warmup):
+        run_one()
+
+    latencies = []
+    trace_ids = []
+    errors = 0
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.sessions) as executor:
+        futures = [executor.submit(run_one) for _ in range(args.requests)]
+        for future in as_completed(futures):
+            try:
+                latency, trace_id = future.result()
+            except Exception as e:
+                errors += 1
+                print(f"Request failed: {type(e).__name__}: {e}")
+                continue
+            latencies.append(latency)
+            trace_ids.append(trace_id)
+    elapsed = time.perf_counter() - started
+
+    if server is not None:
+        server.stop()
+
+    print(f"\nsessions={args.sessions} requests={args.requests} cold={args.cold} wall={elapsed:.1f}s")
+    print(f"throughput: {len(latencies) / elapsed:.2f} analyses/s   errors: {errors}")
+    if latencies:
+        print("latency (s): " + "  ".join(
+            f"{label} {value:.2f}" for label, value in [
+                ("p50", percentile(latencies, 50)),
+                ("p95", percentile(latencies, 95)),
+                ("p99", percentile(latencies, 99)),
+                ("max", max(latencies))
+            ]
+        ))
+
+    tracer = get_tracer()
+    spans = [span for trace_id in trace_ids for span in tracer.spans(trace_id)]
+    print(f"\n{'stage':<32}{'count':>8}{'total_ms':>12}{'p50_ms':>10}{'p95_ms':>10}")
+    for name, stats in summarize_spans(spans).items():
+        print(f"{name:<32}{stats['count']:>8}{stats['total_ms']:>12}{stats['p50_ms']:>10}{stats['p95_ms']:>10}")
+    sys.exit(1 if errors else 0)
+
+if __name__ == "__main__":
+    main()
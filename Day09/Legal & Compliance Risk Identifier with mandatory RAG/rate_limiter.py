@@ -0,0 +1,226 @@
+import os
+import json
+import time
+import heapq
+import itertools
+import threading
+import contextvars
+from contextlib import contextmanager
+from typing import Dict, Any, List, Optional, Callable
+from langchain_core.embeddings import Embeddings
+from tracing import get_tracer
+
+try:
+    import fcntl
+except ImportError:  # Windows: cross-process limiting is unavailable
+    fcntl = None
+
+# Lower values are served first when callers queue for the same model
+INTERACTIVE = 0
+BATCH = 1
+
+request_priority = contextvars.ContextVar("request_priority", default=INTERACTIVE)
+
+@contextmanager
+def priority(level: int):
+    """Run the enclosed Gemini calls at the given priority"""
+    token = request_priority.set(level)
+    try:
+        yield
+    finally:
+        request_priority.reset(token)
+
+def is_rate_limit_error(error: Exception) -> bool:
+    """Recognize quota errors from the Google SDKs and HTTP clients"""
+    text = f"{type(error).__name__} {error}".lower()
+    return "resourceexhausted" in text or "429" in text or "quota" in text or "rate limit" in text
+
+class RateLimiter:
+    """Token-bucket limiter with separate request and token budgets per model.
+
+    Callers queue per model in priority order, so interactive requests are served
+    before batch work waiting on the same budget. A 429 halves the model's
+    effective rate and pauses it with exponential backoff; successful calls slowly
+    restore the configured rate. When `lock_path` is set, bucket state is shared
+    between processes through a lock file (priority ordering stays per process).
+    """
+
+    def __init__(self, lock_path: Optional[str] = None, base_backoff: float = 1.0, max_backoff: float = 60.0):
+        self.lock_path = lock_path if fcntl else None
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self._limits = {}
+        self._state = {}
+        self._waiters = {}
+        self._counter = itertools.count()
+        self._cond = threading.Condition()
+
+    def configure(self, model: str, requests_per_minute: float, tokens_per_minute: Optional[float] = None) -> None:
+        with self._cond:
+            self._limits[model] = {"rpm": requests_per_minute, "tpm": tokens_per_minute}
+
+    def _limits_for(self, model: str) -> Dict[str, Any]:
+        if model not in self._limits:
+            if "embedding" in model:
+                self.configure(
+                    model,
+                    float(os.getenv("EMBEDDING_REQUESTS_PER_MINUTE", "1500")),
+                    None
+                )
+            else:
+                self.configure(
+                    model,
+                    float(os.getenv("LLM_REQUESTS_PER_MINUTE", "60")),
+                    float(os.getenv("LLM_TOKENS_PER_MINUTE", "1000000"))
+                )
+        return self._limits[model]
+
+    def _new_state(self, model: str, now: float) -> Dict[str, float]:
+        limits = self._limits_for(model)
+        return {
+            "requests": limits["rpm"],
+            "tokens": limits["tpm"] or 0,
+            "updated": now,
+            "backoff_until": 0.0,
+            "backoff": 0.0,
+            "scale": 1.0
+        }
+
+    @contextmanager
+    def _shared_state(self):
+        """Yield the mutable state dict, synchronized through the lock file if configured"""
+        if not self.lock_path:
+            yield self._state
+            return
+        with open(self.lock_path, "a+") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                f.seek(0)
+                content = f.read()
+                state = json.loads(content) if content.strip() else {}
+                yield state
+                f.seek(0)
+                f.truncate()
+                json.dump(state, f)
+                f.flush()
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _try_take(self, model: str, tokens: int) -> float:
+        """Take budget for one call, or return how long to wait before retrying"""
+        limits = self._limits_for(model)
+        now = time.time()
+        with self._shared_state() as state:
+            bucket = state.setdefault(model, self._new_state(model, now))
+            if now < bucket["backoff_until"]:
+                return bucket["backoff_until"] - now
+
+            elapsed = now - bucket["updated"]
+            bucket["updated"] = now
+            rpm = limits["rpm"] * bucket["scale"]
+            bucket["requests"] = min(limits["rpm"], bucket["requests"] + elapsed * rpm / 60)
+            waits = []
+            if bucket["requests"] < 1:
+                waits.append((1 - bucket["requests"]) * 60 / rpm)
+            if limits["tpm"]:
+                tpm = limits["tpm"] * bucket["scale"]
+                bucket["tokens"] = min(limits["tpm"], bucket["tokens"] + elapsed * tpm / 60)
+                needed = min(tokens, limits["tpm"])
+                if bucket["tokens"] < needed:
+                    waits.append((needed - bucket["tokens"]) * 60 / tpm)
+            if waits:
+                return max(waits)
+
+            bucket["requests"] -= 1
+            if limits["tpm"]:
+                bucket["tokens"] -= min(tokens, limits["tpm"])
+            return 0.0
+
+    def acquire(self, model: str, tokens: int = 0, level: Optional[int] = None) -> None:
+        """Block until the model's request and token budgets allow one more call"""
+        level = request_priority.get() if level is None else level
+        ticket = (level, next(self._counter))
+        with self._cond:
+            waiters = self._waiters.setdefault(model, [])
+            heapq.heappush(waiters, ticket)
+            try:
+                while True:
+                    if waiters[0] == ticket:
+                        wait_for = self._try_take(model, tokens)
+                        if wait_for <= 0:
+                            return
+                        self._cond.wait(timeout=wait_for)
+                    else:
+                        self._cond.wait()
+            finally:
+                waiters.remove(ticket)
+                heapq.heapify(waiters)
+                self._cond.notify_all()
+
+    def report_rate_limited(self, model: str) -> float:
+        """Learn from a 429: halve the effective rate and back off exponentially"""
+        with self._cond:
+            with self._shared_state() as state:
+                bucket = state.setdefault(model, self._new_state(model, time.time()))
+                bucket["scale"] = max(0.05, bucket["scale"] / 2)
+                bucket["backoff"] = min(self.max_backoff, max(self.base_backoff, bucket["backoff"] * 2))
+                bucket["backoff_until"] = time.time() + bucket["backoff"]
+                bucket["requests"] = 0
+                backoff = bucket["backoff"]
+            self._cond.notify_all()
+        return backoff
+
+    def report_success(self, model: str) -> None:
+        """Gradually restore the configured rate after successful calls"""
+        with self._cond:
+            with self._shared_state() as state:
+                bucket = state.get(model)
+                if bucket and (bucket["scale"] < 1 or bucket["backoff"]):
+                    bucket["scale"] = min(1.0, bucket["scale"] + 0.05)
+                    bucket["backoff"] = 0.0
+
+    def call(self, model: str, fn: Callable, /, *args, tokens: int = 0, retries: int = 3, **kwargs):
+        """Run fn under the limiter, retrying with backoff when it hits a quota error.
+
+        model and fn are positional-only so fn can take its own `model` keyword
+        (e.g. genai.embed_content(model=..., content=...)).
+        """
+        for attempt in range(retries + 1):
+            self.acquire(model, tokens)
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                if not is_rate_limit_error(e) or attempt == retries:
+                    raise
+                backoff = self.report_rate_limited(model)
+                print(f"Rate limited on {model}, backing off {backoff:.1f}s")
+                continue
+            self.report_success(model)
+            return result
+
+_rate_limiter = None
+_rate_limiter_lock = threading.Lock()
+
+def get_rate_limiter() -> RateLimiter:
+    """Process-wide limiter shared by every Gemini call site"""
+    global _rate_limiter
+    with _rate_limiter_lock:
+        if _rate_limiter is None:
+            _rate_limiter = RateLimiter(lock_path=os.getenv("RATE_LIMIT_LOCK_FILE") or None)
+        return _rate_limiter
+
+class RateLimitedEmbeddings(Embeddings):
+    """Embeddings wrapper that routes every embedding request through the shared limiter"""
+
+    def __init__(self, embeddings: Embeddings, model: str):
+        self.embeddings = embeddings
+        self.model = model
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        tokens = sum(len(text) for text in texts) // 4
+        with get_tracer().span("embedding", model=self.model, texts=len(texts), tokens=tokens):
+            return get_rate_limiter().call(self.model, self.embeddings.embed_documents, texts, tokens=tokens)
+
+    def embed_query(self, text: str) -> List[float]:
+        with get_tracer().span("embedding", model=self.model, texts=1, tokens=len(text) // 4):
+            return get_rate_limiter().call(self.model, self.embeddings.embed_query, text, tokens=len(text) // 4)
@@ -0,0 +1,307 @@
+"""
+Offline-built, read-only regulatory knowledge index.
+
+Example:
+    python regulatory_index.py build regulations/ --output regulatory_index
+    python regulatory_index.py info --output regulatory_index
+
+The build ingests PDF, TXT and DOCX files from a directory. The first
+sub-directory names the jurisdiction (regulations/EU/gdpr.pdf -> EU); files at
+the top level are GLOBAL. A folder that matches no known region keeps its own
+name as the code (regulations/Ontario/ -> ONTARIO), so it is only served for
+that jurisdiction. Every build writes a new snapshot (dense vectors, BM25
+postings and chunk metadata) under <output>/snapshots/ and then atomically
+points <output>/CURRENT at it. Files whose content hash is unchanged reuse the
+previous snapshot's chunks and vectors, so only added or edited files are
+extracted and embedded again.
+"""
+import os
+import sys
+import json
+import math
+import time
+import hashlib
+import argparse
+import threading
+from collections import Counter
+from typing import Dict, Any, List, Optional
+import numpy as np
+from utils import extract_text_from_document, tokenize
+from taxonomy import REGION_CODES, normalize_regions, region_matches
+
+SUPPORTED_TYPES = {
+    ".txt": "text/plain",
+    ".pdf": "application/pdf",
+    ".docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+}
+
+EMBEDDING_MODEL = "models/embedding-001"
+
+def file_hash(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+class RegulatoryIndex:
+    """Read-only view of one index snapshot, searched with dense vectors and BM25"""
+
+    def __init__(self, path: str, k1: float = 1.5, b: float = 0.75):
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        with open(os.path.join(path, "manifest.json"), "r", encoding="utf-8") as f:
+            self.manifest = json.load(f)
+        with open(os.path.join(path, "chunks.json"), "r", encoding="utf-8") as f:
+            self.chunks = json.load(f)
+        with open(os.path.join(path, "postings.json"), "r", encoding="utf-8") as f:
+            postings = json.load(f)
+        # Memory-mapped so large snapshots load instantly and stay read-only
+        self.vectors = np.load(os.path.join(path, "vectors.npy"), mmap_mode="r")
+
+        self.postings = postings["postings"]
+        self.doc_lengths = np.array(postings["doc_lengths"], dtype=np.float32)
+        self.avg_length = float(self.doc_lengths.mean()) if len(self.doc_lengths) else 0.0
+        n = len(self.chunks)
+        self.idf = {
+            term: math.log(1 + (n - len(entries) + 0.5) / (len(entries) + 0.5))
+            for term, entries in self.postings.items()
+        }
+
+    @property
+    def version(self) -> str:
+        return self.manifest["version"]
+
+    @classmethod
+    def load(cls, index_dir: str) -> Optional["RegulatoryIndex"]:
+        """Load the snapshot CURRENT points at, or None if nothing has been built"""
+        pointer = os.path.join(index_dir, "CURRENT")
+        if not os.path.exists(pointer):
+            return None
+        with open(pointer, "r", encoding="utf-8") as f:
+            snapshot = f.read().strip()
+        return cls(os.path.join(index_dir, "snapshots", snapshot))
+
+    def _bm25(self, query: str) -> np.ndarray:
+        scores = np.zeros(len(self.chunks), dtype=np.float32)
+        if not self.avg_length:
+            return scores
+        for term in set(tokenize(query)):
+            for index, tf in self.postings.get(term, []):
+                norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[index] / self.avg_length)
+                scores[index] += self.idf[term] * tf * (self.k1 + 1) / (tf + norm)
+        return scores
+
+    def search(self,
+               query: str,
+               query_vector: Optional[List[float]] = None,
+               k: int = 5,
+               jurisdictions: Optional[List[str]] = None,
+               alpha: float = 0.5) -> List[Dict[str, Any]]:
+        """Hybrid search: `alpha` weights dense similarity against BM25 (BM25 only without a query vector)"""
+        if not self.chunks:
+            return []
+        scores = self._bm25(query)
+        if scores.max() > 0:
+            scores = scores / scores.max()
+        if query_vector is not None and len(self.vectors):
+            vector = np.asarray(query_vector, dtype=np.float32)
+            dense = self.vectors @ (vector / (np.linalg.norm(vector) or 1.0))
+            scores = alpha * np.clip(dense, 0, None) + (1 - alpha) * scores
+
+        results = []
+        for index in np.argsort(-scores):
+            if scores[index] <= 0 or len(results) >= k:
+                break
+            chunk = self.chunks[index]
+            if not region_matches(chunk["jurisdiction"], jurisdictions or []):
+                continue
+            results.append({**chunk, "score": float(scores[index])})
+        return results
+
+def _chunk_text(text: str, chunk_size: int, chunk_overlap: int) -> List[str]:
+    from langchain.text_splitter import RecursiveCharacterTextSplitter
+    splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap, length_function=len)
+    return splitter.split_text(text)
+
+def _jurisdiction_for(relative_path: str) -> str:
+    parts = relative_path.replace(os.sep, "/").split("/")
+    if len(parts) < 2:
+        return "GLOBAL"
+    folder = parts[0].strip()
+    codes = normalize_regions([folder])
+    is_global_alias = folder.upper() == "GLOBAL" or folder.lower() in REGION_CODES["GLOBAL"]
+    if codes == ["GLOBAL"] and not is_global_alias:
+        # normalize_regions falls back to GLOBAL when nothing matches; an unknown
+        # folder must not be served for every jurisdiction
+        code = folder.upper()
+        print(f"Unknown jurisdiction folder '{folder}', indexing its documents as '{code}'")
+        return code
+    return codes[0]
+
+def _scan(source_dir: str) -> Dict[str, str]:
+    """Relative path -> content hash for every supported file"""
+    files = {}
+    for root, _, names in os.walk(source_dir):
+        for name in sorted(names):
+            if os.path.splitext(name)[1].lower() in SUPPORTED_TYPES:
+                path = os.path.join(root, name)
+                files[os.path.relpath(path, source_dir)] = file_hash(path)
+    return files
+
+def build_index(source_dir: str,
+                output_dir: str,
+                chunk_size: int = 1000,
+                chunk_overlap: int = 200,
+                batch_size: int = 64) -> Dict[str, Any]:
+    """Build a new snapshot, reusing unchanged files from the current one"""
+    previous = RegulatoryIndex.load(output_dir)
+    settings = {"chunk_size": chunk_size, "chunk_overlap": chunk_overlap, "embedding_model": EMBEDDING_MODEL}
+    if previous is not None and previous.manifest["settings"] != settings:
+        print("Chunking or embedding settings changed, rebuilding every file")
+        previous = None
+
+    files = _scan(source_dir)
+    previous_files = previous.manifest["files"] if previous else {}
+    report = {"reused": 0, "added": 0, "changed": 0, "relabelled": 0, "removed": len(set(previous_files) - set(files))}
+
+    chunks = []
+    vectors = []
+    pending_chunks = []
+    pending_texts = []
+    manifest_files = {}
+    for relative_path, digest in sorted(files.items()):
+        old = previous_files.get(relative_path)
+        jurisdiction = _jurisdiction_for(relative_path)
+        if old is not None and old["hash"] == digest:
+            start, end = old["chunks"]
+            manifest_files[relative_path] = {"hash": digest, "chunks": [len(chunks), len(chunks) + end - start]}
+            reused = previous.chunks[start:end]
+            if any(chunk["jurisdiction"] != jurisdiction for chunk in reused):
+                # Labelled by an older jurisdiction mapping; the vectors are still valid
+                reused = [{**chunk, "jurisdiction": jurisdiction} for chunk in reused]
+                report["relabelled"] += 1
+            chunks.extend(reused)
+            vectors.extend(np.asarray(previous.vectors[start:end]))
+            report["reused"] += 1
+            continue
+
+        report["changed" if old is not None else "added"] += 1
+        extension = os.path.splitext(relative_path)[1].lower()
+        with open(os.path.join(source_dir, relative_path), "rb") as f:
+            text = extract_text_from_document(f.read(), SUPPORTED_TYPES[extension])
+        pieces = _chunk_text(text, chunk_size, chunk_overlap)
+        manifest_files[relative_path] = {"hash": digest, "chunks": [len(chunks), len(chunks) + len(pieces)]}
+        for position, piece in enumerate(pieces):
+            pending_chunks.append(len(chunks))
+            pending_texts.append(piece)
+            chunks.append({
+                "content": piece,
+                "source": relative_path,
+                "jurisdiction": jurisdiction,
+                "file_hash": digest,
+                "position": position
+            })
+            vectors.append(None)
+
+    if previous is not None and not (report["added"] or report["changed"] or report["removed"] or report["relabelled"]):
+        report.update({"version": previous.version, "files": len(files), "chunks": len(chunks)})
+        return report
+
+    if pending_texts:
+        from clients import LazyClients
+        embeddings = LazyClients().embeddings
+        for offset in range(0, len(pending_texts), batch_size):
+            batch = pending_texts[offset:offset + batch_size]
+            print(f"Embedding chunks {offset + 1}-{offset + len(batch)} of {len(pending_texts)}")
+            for index, vector in zip(pending_chunks[offset:offset + batch_size], embeddings.embed_documents(batch)):
+                vector = np.asarray(vector, dtype=np.float32)
+                vectors[index] = vector / (np.linalg.norm(vector) or 1.0)
+
+    # Postings are cheap to recompute and depend on the whole corpus (document frequencies)
+    postings = {}
+    doc_lengths = []
+    for index, chunk in enumerate(chunks):
+        counts = Counter(tokenize(chunk["content"]))
+        doc_lengths.append(sum(counts.values()))
+        for term, tf in counts.items():
+            postings.setdefault(term, []).append([index, tf])
+
+    snapshots_dir = os.path.join(output_dir, "snapshots")
+    existing = [name for name in os.listdir(snapshots_dir) if name.startswith("v")] if os.path.isdir(snapshots_dir) else []
+    version = f"v{max((int(name[1:]) for name in existing), default=0) + 1:04d}"
+    snapshot_dir = os.path.join(snapshots_dir, version)
+    os.makedirs(snapshot_dir)
+    matrix = np.vstack(vectors).astype(np.float32) if vectors else np.zeros((0, 0), dtype=np.float32)
+    np.save(os.path.join(snapshot_dir, "vectors.npy"), matrix)
+    with open(os.path.join(snapshot_dir, "chunks.json"), "w", encoding="utf-8") as f:
+        json.dump(chunks, f)
+    with open(os.path.join(snapshot_dir, "postings.json"), "w", encoding="utf-8") as f:
+        json.dump({"postings": postings, "doc_lengths": doc_lengths}, f)
+    with open(os.path.join(snapshot_dir, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump({
+            "version": version,
+            "created_at": time.time(),
+            "source_dir": os.path.abspath(source_dir),
+            "settings": settings,
+            "files": manifest_files
+        }, f, indent=2)
+    # Snapshots are immutable once published
+    for name in os.listdir(snapshot_dir):
+        os.chmod(os.path.join(snapshot_dir, name), 0o444)
+
+    pointer = os.path.join(output_dir, "CURRENT")
+    with open(f"{pointer}.tmp", "w", encoding="utf-8") as f:
+        f.write(version)
+    os.replace(f"{pointer}.tmp", pointer)
+
+    report.update({"version": version, "files": len(files), "chunks": len(chunks)})
+    return report
+
+_regulatory_index = None
+_regulatory_index_loaded = False
+_regulatory_index_lock = threading.Lock()
+
+def get_regulatory_index() -> Optional[RegulatoryIndex]:
+    """Process-wide snapshot from REGULATORY_INDEX_DIR, or None if none has been built"""
+    global _regulatory_index, _regulatory_index_loaded
+    with _regulatory_index_lock:
+        if not _regulatory_index_loaded:
+            _regulatory_index = RegulatoryIndex.load(os.getenv("REGULATORY_INDEX_DIR", "regulatory_index"))
+            _regulatory_index_loaded = True
+        return _regulatory_index
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or inspect the offline regulatory index")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    build = subparsers.add_parser("build", help="Ingest a directory of regulation texts into a new snapshot")
+    build.add_argument("source_dir", help="Directory of .pdf, .txt and .docx files (sub-directories name jurisdictions)")
+    build.add_argument("--output", default="regulatory_index", help="Index directory")
+    build.add_argument("--chunk-size", type=int, default=1000, help="Characters per chunk")
+    build.add_argument("--chunk-overlap", type=int, default=200, help="Characters shared by consecutive chunks")
+    info = subparsers.add_parser("info", help="Describe the current snapshot")
+    info.add_argument("--output", default="regulatory_index", help="Index directory")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        from dotenv import load_dotenv
+        load_dotenv()
+        started = time.time()
+        report = build_index(args.source_dir, args.output, chunk_size=args.chunk_size, chunk_overlap=args.chunk_overlap)
+        print(f"Index at {report['version']} after {time.time() - started:.1f}s: {report['files']} files, "
+              f"{report['chunks']} chunks ({report['added']} added, {report['changed']} changed, "
+              f"{report['reused']} reused, {report['relabelled']} relabelled, {report['removed']} removed)")
+    else:
+        index = RegulatoryIndex.load(args.output)
+        if index is None:
+            print(f"No snapshot in {args.output}")
+            sys.exit(1)
+        print(f"Snapshot {index.version}: {len(index.manifest['files'])} files, {len(index.chunks)} chunks, "
+              f"{len(index.postings)} terms")
+        for relative_path, entry in sorted(index.manifest["files"].items()):
+            start, end = entry["chunks"]
+            print(f"  {relative_path}: {end - start} chunks, sha256 {entry['hash'][:12]}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,236 @@
+"""
+HTTP API around ComplianceWorkflow.
+
+Run:
+    uvicorn service:app --host 0.0.0.0 --port 8000
+
+Endpoints:
+    POST /analyses                 {"business_description": "..."} -> 202 {"job_id", "status", ...}
+    GET  /analyses/{job_id}        job status, plus the result once finished
+    GET  /analyses/{job_id}/stream server-sent events replaying and following the job's events
+    GET  /analyses/{job_id}/trace  per-stage summary and spans recorded while the job ran
+    GET  /health                   queue and worker statistics
+
+Jobs run on an in-process queue served by ANALYSIS_WORKERS worker threads.
+Submitting a description that is already queued or running returns the existing
+job, so concurrent duplicates share one execution. Finished results are kept for
+ANALYSIS_RESULT_TTL_SECONDS and returned immediately as completed jobs. Submitting
+with "refresh": true skips the result cache and recomputes every stage.
+"""
+import os
+import json
+import time
+import uuid
+import asyncio
+import contextvars
+from contextlib import asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+from agents import ComplianceWorkflow
+from utils import ResultCache, description_key
+from tracing import get_tracer, summarize_spans
+
+class AnalysisRequest(BaseModel):
+    business_description: str = Field(min_length=1, description="Detailed description of the business")
+    refresh: bool = Field(default=False, description="Recompute every stage instead of serving cached results")
+
+class Job:
+    """One analysis execution and the events it has produced so far"""
+
+    def __init__(self, key: str, business_description: str, refresh: bool = False):
+        self.id = uuid.uuid4().hex
+        self.key = key
+        self.business_description = business_description
+        self.refresh = refresh
+        self.status = "queued"
+        self.events: List[Dict[str, Any]] = []
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+        # Set once the job starts running; jobs answered from the result cache have none
+        self.trace_id: Optional[str] = None
+        self._changed = asyncio.Event()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("done", "failed")
+
+    def publish(self, event: Dict[str, Any]) -> None:
+        """Append an event and wake stream readers (must run on the event loop)"""
+        self.events.append(event)
+        if event.get("stage") == "done":
+            self.result = event["data"]
+        self._notify()
+
+    def finish(self, error: Optional[str] = None) -> None:
+        self.status = "failed" if error else "done"
+        self.error = error
+        self.finished_at = time.time()
+        self._notify()
+
+    def _notify(self) -> None:
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    async def wait(self) -> None:
+        await self._changed.wait()
+
+    def to_dict(self, include_result: bool = True) -> Dict[str, Any]:
+        data = {
+            "job_id": self.id,
+            "status": self.status,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+            "events": len(self.events)
+        }
+        if self.error:
+            data["error"] = self.error
+        if include_result and self.result is not None:
+            data["result"] = self.result
+        return data
+
+class JobManager:
+    """In-process job queue with a worker pool, in-flight dedup and a TTL result cache"""
+
+    def __init__(self, workers: int = 2, result_ttl: float = 3600, max_jobs: int = 1000):
+        self.workers = workers
+        self.workflow = ComplianceWorkflow()
+        self.results = ResultCache(max_entries=max_jobs, ttl=result_ttl)
+        self.jobs = ResultCache(max_entries=max_jobs, ttl=result_ttl)
+        self.in_flight: Dict[str, Job] = {}
+        self.queue: Optional[asyncio.Queue] = None
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="analysis")
+        self._tasks: List[asyncio.Task] = []
+
+    def start(self) -> None:
+        self.queue = asyncio.Queue()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    @staticmethod
+    def _flight_key(job_key: str, refresh: bool) -> str:
+        # A refresh must not join a job that may be serving cached stages
+        return f"refresh:{job_key}" if refresh else job_key
+
+    def submit(self, business_description: str, refresh: bool = False) -> Dict[str, Any]:
+        key = description_key(business_description)
+        cached = None if refresh else self.results.get(key)
+        if cached is not None:
+            job = Job(key, business_description)
+            job.publish({"stage": "done", "type": "result", "data": cached})
+            job.finish()
+            self.jobs.set(job.id, job)
+            return {**job.to_dict(include_result=False), "cached": True, "deduplicated": False}
+
+        job = self.in_flight.get(self._flight_key(key, refresh))
+        if job is not None:
+            return {**job.to_dict(include_result=False), "cached": False, "deduplicated": True}
+
+        job = Job(key, business_description, refresh=refresh)
+        self.in_flight[self._flight_key(key, refresh)] = job
+        self.jobs.set(job.id, job)
+        self.queue.put_nowait(job)
+        return {**job.to_dict(include_result=False), "cached": False, "deduplicated": False}
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self.jobs.get(job_id)
+
+    async def _worker(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            job = await self.queue.get()
+            job.status = "running"
+            try:
+                # Copy the context so tracing started here follows the job into the thread
+                context = contextvars.copy_context()
+                await loop.run_in_executor(self._executor, context.run, self._run, job, loop)
+                job.finish()
+                if job.result is not None:
+                    self.results.set(job.key, job.result)
+            except Exception as e:
+                print(f"Error running analysis job {job.id}: {str(e)}")
+                job.finish(error=str(e))
+            finally:
+                self.in_flight.pop(self._flight_key(job.key, job.refresh), None)
+                self.queue.task_done()
+
+    def _run(self, job: Job, loop: asyncio.AbstractEventLoop) -> None:
+        with get_tracer().trace("service_analysis", job_id=job.id) as trace_id:
+            job.trace_id = trace_id
+            for event in self.workflow.analyze_business_stream(job.business_description, refresh=job.refresh):
+                loop.call_soon_threadsafe(job.publish, event)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "queued": self.queue.qsize() if self.queue else 0,
+            "in_flight": len(self.in_flight),
+            "cached_results": len(self.results)
+        }
+
+manager = JobManager(
+    workers=int(os.getenv("ANALYSIS_WORKERS", "2")),
+    result_ttl=float(os.getenv("ANALYSIS_RESULT_TTL_SECONDS", "3600"))
+)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    manager.start()
+    yield
+    await manager.stop()
+
+app = FastAPI(title="Legal & Compliance Risk Identifier API", lifespan=lifespan)
+
+def _job_or_404(job_id: str) -> Job:
+    job = manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired job")
+    return job
+
+@app.post("/analyses", status_code=202)
+async def submit_analysis(request: AnalysisRequest) -> Dict[str, Any]:
+    return manager.submit(request.business_description, refresh=request.refresh)
+
+@app.get("/analyses/{job_id}")
+async def get_analysis(job_id: str) -> Dict[str, Any]:
+    return _job_or_404(job_id).to_dict()
+
+@app.get("/analyses/{job_id}/stream")
+async def stream_analysis(job_id: str) -> StreamingResponse:
+    job = _job_or_404(job_id)
+
+    async def events():
+        sent = 0
+        while True:
+            # Events are published on this event loop, so nothing can arrive
+            # between the checks below and the wait
+            while sent < len(job.events):
+                event = job.events[sent]
+                sent += 1
+                yield f"event: {event['type']}\ndata: {json.dumps(event, default=str)}\n\n"
+            if job.finished:
+                status = {"status": job.status, "error": job.error}
+                yield f"event: end\ndata: {json.dumps(status)}\n\n"
+                return
+            await job.wait()
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+@app.get("/analyses/{job_id}/trace")
+async def get_analysis_trace(job_id: str) -> Dict[str, Any]:
+    job = _job_or_404(job_id)
+    spans = get_tracer().spans(job.trace_id) if job.trace_id else []
+    return {"job_id": job.id, "trace_id": job.trace_id, "summary": summarize_spans(spans), "spans": spans}
+
+@app.get("/health")
+async def health() -> Dict[str, Any]:
+    return {"status": "ok", **manager.stats()}
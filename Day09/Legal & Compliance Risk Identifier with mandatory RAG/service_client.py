@@ -0,0 +1,38 @@
+import json
+from typing import Dict, Any, Iterator
+
+def submit_analysis(base_url: str, business_description: str, refresh: bool = False) -> str:
+    """Submit an analysis to the compliance API (service.py) and return its job id"""
+    import requests
+    response = requests.post(f"{base_url.rstrip('/')}/analyses", json={"business_description": business_description, "refresh": refresh}, timeout=30)
+    response.raise_for_status()
+    return response.json()["job_id"]
+
+def stream_job(base_url: str, job_id: str, timeout: float = 600) -> Iterator[Dict[str, Any]]:
+    """Yield a submitted job's events as they arrive"""
+    import requests
+    with requests.get(f"{base_url.rstrip('/')}/analyses/{job_id}/stream", stream=True, timeout=timeout) as stream:
+        stream.raise_for_status()
+        event_type = None
+        for line in stream.iter_lines(decode_unicode=True):
+            if line.startswith("event: "):
+                event_type = line[len("event: "):]
+            elif line.startswith("data: "):
+                data = json.loads(line[len("data: "):])
+                if event_type == "end":
+                    if data["status"] == "failed":
+                        raise RuntimeError(f"Analysis failed: {data['error']}")
+                    return
+                yield data
+
+def stream_analysis(base_url: str, business_description: str, timeout: float = 600, refresh: bool = False) -> Iterator[Dict[str, Any]]:
+    """Submit an analysis to the compliance API (service.py) and yield its events as they arrive"""
+    job_id = submit_analysis(base_url, business_description, refresh=refresh)
+    yield from stream_job(base_url, job_id, timeout=timeout)
+
+def fetch_trace(base_url: str, job_id: str) -> Dict[str, Any]:
+    """Per-stage summary and spans the compliance API recorded for a job"""
+    import requests
+    response = requests.get(f"{base_url.rstrip('/')}/analyses/{job_id}/trace", timeout=30)
+    response.raise_for_status()
+    return response.json()
@@ -0,0 +1,370 @@
+"""
+Local stand-in for every external service the compliance pipeline calls.
+
+Example:
+    python standin_server.py --port 8765 --latency llm=lognormal:800:0.5 --error-rate llm=0.02
+    LEGAL_STANDIN_URL=http://127.0.0.1:8765 streamlit run app.py
+
+Emulated endpoints:
+    /v1beta/models/<model>:generateContent        Gemini chat (canned, prompt-aware output)
+    /v1beta/models/<model>:streamGenerateContent  Gemini chat, streamed in chunks
+    /v1beta/models/<model>:embedContent           Gemini embeddings (deterministic vectors)
+    /v1beta/models/<model>:batchEmbedContents
+    /ext/api-inference.huggingface.co/...         Hugging Face inference
+    /ext/<legal or government host>/...           legal site HTML and government search JSON
+
+Latency is configured per endpoint class (llm, embedding, hf, legal) as
+fixed:<ms>, uniform:<min_ms>:<max_ms>, normal:<mean_ms>:<sd_ms> or
+lognormal:<median_ms>:<sigma>. Error rates are fractions of requests answered
+with 429 (Gemini) or 503 (everything else).
+"""
+import re
+import json
+import math
+import time
+import random
+import hashlib
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Any, List, Optional, Callable
+from urllib.parse import urlsplit, parse_qs
+
+DEFAULT_LATENCY = {
+    "llm": "lognormal:800:0.5",
+    "embedding": "lognormal:60:0.3",
+    "hf": "lognormal:250:0.4",
+    "legal": "lognormal:400:0.6"
+}
+
+EMBEDDING_DIMENSIONS = 768
+
+def parse_distribution(spec: str) -> Callable[[], float]:
+    """Turn a latency spec into a sampler returning seconds"""
+    kind, *values = spec.split(":")
+    values = [float(value) for value in values]
+    if kind == "fixed":
+        return lambda: values[0] / 1000
+    if kind == "uniform":
+        return lambda: random.uniform(values[0], values[1]) / 1000
+    if kind == "normal":
+        return lambda: max(0.0, random.gauss(values[0], values[1])) / 1000
+    if kind == "lognormal":
+        return lambda: random.lognormvariate(math.log(values[0]), values[1]) / 1000
+    raise ValueError(f"Unknown latency distribution: {spec}")
+
+def _pairs(items: List[str]) -> Dict[str, str]:
+    pairs = {}
+    for item in items:
+        name, _, value = item.partition("=")
+        pairs[name.strip()] = value.strip()
+    return pairs
+
+class StandinConfig:
+    """Latency samplers, error rates and output sizes for the stand-in"""
+
+    def __init__(self,
+                 latency: Optional[Dict[str, str]] = None,
+                 error_rates: Optional[Dict[str, float]] = None,
+                 stream_chunks: int = 8,
+                 completion_words: int = 250,
+                 seed: Optional[int] = None):
+        specs = {**DEFAULT_LATENCY, **(latency or {})}
+        self.latency = {name: parse_distribution(spec) for name, spec in specs.items()}
+        self.latency_specs = specs
+        self.error_rates = error_rates or {}
+        self.stream_chunks = stream_chunks
+        self.completion_words = completion_words
+        if seed is not None:
+            random.seed(seed)
+
+    def delay(self, endpoint: str) -> float:
+        return self.latency[endpoint]()
+
+    def should_fail(self, endpoint: str) -> bool:
+        return random.random() < self.error_rates.get(endpoint, 0.0)
+
+DOMAIN_KEYWORDS = {
+    "healthtech": ["health", "patient", "medical", "clinic"],
+    "fintech": ["payment", "bank", "lending", "fintech", "crypto"],
+    "e-commerce": ["shop", "store", "e-commerce", "marketplace", "retail"],
+    "edtech": ["education", "student", "learning", "school"],
+    "saas": ["software", "saas", "platform", "b2b"]
+}
+
+REGION_KEYWORDS = {
+    "US-CA": ["california"],
+    "US": ["united states", "usa", " us "],
+    "EU": ["eu ", "europe", "european"],
+    "GB": ["uk", "united kingdom", "britain"],
+    "IN": ["india"]
+}
+
+def _business_analysis(prompt: str) -> str:
+    text = f" {prompt.lower()} "
+    domain = next((name for name, words in DOMAIN_KEYWORDS.items() if any(word in text for word in words)), "saas")
+    regions = [code for code, words in REGION_KEYWORDS.items() if any(word in text for word in words)] or ["US"]
+    return json.dumps({
+        "domain": domain,
+        "regions": regions,
+        "target_market": "Small and medium businesses",
+        "activities": ["data processing", "online services", "customer onboarding"]
+    })
+
+def _risks(prompt: str) -> str:
+    risks = [
+        ("Data privacy non-compliance", "GDPR / CCPA", "High"),
+        ("Inadequate data security controls", "HIPAA Security Rule", "High"),
+        ("Unprotected intellectual property", "Trademark and copyright law", "Medium"),
+        ("Misclassified contractors", "Employment law", "Medium"),
+        ("Missing terms of service", "Consumer protection law", "Low")
+    ]
+    return "```json\n" + json.dumps([{
+        "risk_name": name,
+        "law_or_framework": law,
+        "description": f"{name} identified for the described business. {prompt[:80]}",
+        "severity": severity,
+        "status": "Pending"
+    } for name, law, severity in risks], indent=2) + "\n```"
+
+def _prose(prompt: str, words: int) -> str:
+    vocabulary = ("compliance requirement policy regulation consent retention notice audit "
+                  "obligation control privacy security contract register review").split()
+    rng = random.Random(hashlib.sha256(prompt.encode("utf-8")).hexdigest())
+    lines = []
+    for index in range(max(1, words // 12)):
+        lines.append(f"- [ ] Item {index + 1}: " + " ".join(rng.choice(vocabulary) for _ in range(11)))
+    return "\n".join(lines)
+
+def completion_for(prompt: str, words: int) -> str:
+    """Canned output shaped like what each agent's parser expects"""
+    lowered = prompt.lower()
+    if "business model analyzer" in lowered:
+        return _business_analysis(prompt)
+    if "risk detection expert" in lowered:
+        return _risks(prompt)
+    return _prose(prompt, words)
+
+def embedding_for(text: str) -> List[float]:
+    """Deterministic pseudo-embedding so identical texts map to identical vectors"""
+    seed = int(hashlib.sha256(text.encode("utf-8")).hexdigest()[:16], 16)
+    rng = random.Random(seed)
+    return [rng.uniform(-1, 1) for _ in range(EMBEDDING_DIMENSIONS)]
+
+def _prompt_text(body: Dict[str, Any]) -> str:
+    return "\n".join(
+        part.get("text", "")
+        for content in body.get("contents", [])
+        for part in content.get("parts", [])
+    )
+
+def _content_text(content: Dict[str, Any]) -> str:
+    return "\n".join(part.get("text", "") for part in content.get("parts", []))
+
+def _candidate(text: str, finished: bool = True) -> Dict[str, Any]:
+    candidate = {"content": {"parts": [{"text": text}], "role": "model"}, "index": 0}
+    if finished:
+        candidate["finishReason"] = "STOP"
+    return candidate
+
+LEGAL_PAGE = """<html><head><title>{host}</title><script>var tracking = 1;</script></head>
+<body><nav><a href="/">Home</a> <a href="/search">Search</a></nav>
+<main><h1>Search results for {query}</h1>
+<p>Businesses handling personal data must establish a lawful basis for processing, publish a privacy notice and honour data subject requests within statutory deadlines.</p>
+<p>Regulators expect documented security controls, breach notification procedures and records of processing activities proportional to the risk.</p>
+<p>Contracts with vendors that process data on the business's behalf must include data protection terms and audit rights.</p>
+</main><footer>Copyright {host}</footer></body></html>"""
+
+class StandinHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    config: StandinConfig = None
+    model_route = re.compile(r"^/v1(?:beta)?/models/([^/:]+):(\w+)$")
+
+    def log_message(self, format, *args):
+        # Keep load tests quiet; the driver reports its own metrics
+        pass
+
+    def _read_json(self) -> Dict[str, Any]:
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}") if length else {}
+
+    def _send_json(self, status: int, payload: Any) -> None:
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_html(self, html: str) -> None:
+        body = html.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _fail(self, endpoint: str) -> bool:
+        """Sleep for the sampled latency, then maybe answer with an error"""
+        time.sleep(self.config.delay(endpoint))
+        if not self.config.should_fail(endpoint):
+            return False
+        if endpoint in ("llm", "embedding"):
+            self._send_json(429, {"error": {"code": 429, "message": "Resource has been exhausted (e.g. check quota).", "status": "RESOURCE_EXHAUSTED"}})
+        else:
+            self._send_json(503, {"error": "Service temporarily unavailable"})
+        return True
+
+    def do_POST(self):
+        path = urlsplit(self.path).path
+        body = self._read_json()
+        match = self.model_route.match(path)
+        if match:
+            method = match.group(2)
+            if method in ("embedContent", "batchEmbedContents"):
+                return self._embed(method, body)
+            if method == "generateContent":
+                return self._generate(body)
+            if method == "streamGenerateContent":
+                return self._stream(body)
+        if path.startswith("/ext/api-inference.huggingface.co/"):
+            if self._fail("hf"):
+                return
+            return self._send_json(200, [[{"label": "LABEL_1", "score": 0.91}, {"label": "LABEL_0", "score": 0.09}]])
+        self._send_json(404, {"error": f"No stand-in for POST {path}"})
+
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        if not parts.path.startswith("/ext/"):
+            return self._send_json(404, {"error": f"No stand-in for GET {parts.path}"})
+        if self._fail("legal"):
+            return
+        host = parts.path.split("/")[2]
+        query = " ".join(parse_qs(parts.query).get("q", ["compliance"]))
+        if host == "api.regulations.gov":
+            return self._send_json(200, {"data": [
+                {"id": f"REG-{index}", "description": f"Proposed rule {index} on {query}: reporting and consumer protection obligations."}
+                for index in range(3)
+            ]})
+        if host == "eur-lex.europa.eu":
+            return self._send_json(200, {"results": [
+                {"id": f"CELEX-{index}", "description": f"EU regulation {index} relevant to {query}: data protection and market conduct."}
+                for index in range(3)
+            ]})
+        self._send_html(LEGAL_PAGE.format(host=host, query=query))
+
+    def _embed(self, method: str, body: Dict[str, Any]) -> None:
+        if self._fail("embedding"):
+            return
+        if method == "embedContent":
+            return self._send_json(200, {"embedding": {"values": embedding_for(_content_text(body.get("content", {})))}})
+        self._send_json(200, {"embeddings": [
+            {"values": embedding_for(_content_text(request.get("content", {})))}
+            for request in body.get("requests", [])
+        ]})
+
+    def _usage(self, prompt: str, completion: str) -> Dict[str, int]:
+        prompt_tokens = len(prompt) // 4
+        completion_tokens = len(completion) // 4
+        return {"promptTokenCount": prompt_tokens, "candidatesTokenCount": completion_tokens,
+                "totalTokenCount": prompt_tokens + completion_tokens}
+
+    def _generate(self, body: Dict[str, Any]) -> None:
+        if self._fail("llm"):
+            return
+        prompt = _prompt_text(body)
+        completion = completion_for(prompt, self.config.completion_words)
+        self._send_json(200, {"candidates": [_candidate(completion)], "usageMetadata": self._usage(prompt, completion)})
+
+    def _stream(self, body: Dict[str, Any]) -> None:
+        # The sampled latency is split between time to first chunk and the chunks themselves
+        total = self.config.delay("llm")
+        if self.config.should_fail("llm"):
+            time.sleep(total)
+            return self._send_json(429, {"error": {"code": 429, "message": "Resource has been exhausted (e.g. check quota).", "status": "RESOURCE_EXHAUSTED"}})
+        prompt = _prompt_text(body)
+        completion = completion_for(prompt, self.config.completion_words)
+        size = max(1, math.ceil(len(completion) / self.config.stream_chunks))
+        pieces = [completion[i:i + size] for i in range(0, len(completion), size)]
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        # The REST transport reads a streamed JSON array of GenerateContentResponse objects
+        time.sleep(total / 2)
+        for index, piece in enumerate(pieces):
+            last = index == len(pieces) - 1
+            message = {"candidates": [_candidate(piece, finished=last)]}
+            if last:
+                message["usageMetadata"] = self._usage(prompt, completion)
+            self._write_chunk(("[" if index == 0 else ",") + json.dumps(message) + ("]" if last else ""))
+            if not last:
+                time.sleep(total / 2 / len(pieces))
+        self._write_chunk("")
+
+    def _write_chunk(self, text: str) -> None:
+        data = text.encode("utf-8")
+        self.wfile.write(f"{len(data):X}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+class StandinServer:
+    """Run the stand-in in a background thread (for in-process load tests)"""
+
+    def __init__(self, config: Optional[StandinConfig] = None, host: str = "127.0.0.1", port: int = 0):
+        handler = type("ConfiguredStandinHandler", (StandinHandler,), {"config": config or StandinConfig()})
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> str:
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self.url
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+def add_config_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--latency", action="append", default=[], metavar="ENDPOINT=SPEC",
+                        help="Latency per endpoint class (llm, embedding, hf, legal), e.g. llm=lognormal:800:0.5")
+    parser.add_argument("--error-rate", action="append", default=[], metavar="ENDPOINT=RATE",
+                        help="Fraction of failing requests per endpoint class, e.g. llm=0.02")
+    parser.add_argument("--stream-chunks", type=int, default=8, help="Chunks per streamed completion")
+    parser.add_argument("--completion-words", type=int, default=250, help="Approximate length of free-text completions")
+    parser.add_argument("--seed", type=int, default=None, help="Random seed for latency and error sampling")
+
+def config_from_args(args: argparse.Namespace) -> StandinConfig:
+    return StandinConfig(
+        latency=_pairs(args.latency),
+        error_rates={name: float(rate) for name, rate in _pairs(args.error_rate).items()},
+        stream_chunks=args.stream_chunks,
+        completion_words=args.completion_words,
+        seed=args.seed
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve offline stand-ins for Gemini, Hugging Face and legal endpoints")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    add_config_arguments(parser)
+    args = parser.parse_args()
+
+    config = config_from_args(args)
+    server = StandinServer(config, args.host, args.port)
+    print(f"Stand-in listening on {server.url}  (export LEGAL_STANDIN_URL={server.url})")
+    for name, spec in sorted(config.latency_specs.items()):
+        print(f"  {name:<10} latency {spec:<22} error rate {config.error_rates.get(name, 0.0):.3f}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.httpd.server_close()
+
+if __name__ == "__main__":
+    main()
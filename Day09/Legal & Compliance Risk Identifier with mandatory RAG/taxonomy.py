@@ -0,0 +1,84 @@
+"""
+Canonical business domains and region codes shared by the agents and the
+regulatory index, with the helpers that map free text onto them.
+"""
+import re
+from typing import List
+
+# Canonical business domains and the phrases that map to them
+DOMAIN_TAXONOMY = {
+    "fintech": ["fintech", "financial technology", "payments", "banking", "lending", "crypto", "insurance", "insurtech"],
+    "healthtech": ["healthtech", "health tech", "healthcare", "medical", "patient", "telehealth", "digital health"],
+    "edtech": ["edtech", "education", "e-learning", "learning platform", "tutoring"],
+    "e-commerce": ["e-commerce", "ecommerce", "online retail", "online store", "retail"],
+    "marketplace": ["marketplace", "gig economy", "two-sided"],
+    "saas": ["saas", "software as a service", "b2b software", "enterprise software"],
+    "proptech": ["proptech", "real estate", "property"],
+    "logistics": ["logistics", "delivery", "shipping", "supply chain", "mobility"],
+    "foodtech": ["foodtech", "food", "restaurant", "grocery"],
+    "media": ["media", "content", "social network", "streaming", "gaming"],
+    "biotech": ["biotech", "life sciences", "pharma", "genomics"],
+    "other": []
+}
+
+# Canonical region codes (ISO 3166 / ISO 3166-2 where applicable) and their aliases
+REGION_CODES = {
+    "US-CA": ["california"],
+    "US-NY": ["new york"],
+    # No bare "america": it would turn "Latin America" or "South America" into US
+    "US": ["united states", "united states of america", "usa", "u.s.", "us"],
+    "EU": ["european union", "eu", "europe"],
+    "GB": ["united kingdom", "uk", "gb", "england", "britain"],
+    "CA": ["canada"],
+    "IN": ["india"],
+    "DE": ["germany"],
+    "FR": ["france"],
+    "AU": ["australia"],
+    "SG": ["singapore"],
+    "JP": ["japan"],
+    "BR": ["brazil"],
+    "GLOBAL": ["global", "worldwide", "international"]
+}
+
+def normalize_domain(value: str) -> str:
+    """Map a free-text domain onto DOMAIN_TAXONOMY"""
+    value = value.strip().lower()
+    if value in DOMAIN_TAXONOMY:
+        return value
+    for domain, aliases in DOMAIN_TAXONOMY.items():
+        if any(alias in value for alias in aliases):
+            return domain
+    return "other"
+
+def normalize_regions(values: List[str]) -> List[str]:
+    """Map free-text regions onto canonical region codes, sorted and deduplicated"""
+    codes = set()
+    for value in values:
+        cleaned = value.strip().lower()
+        if value.strip().upper() in REGION_CODES:
+            codes.add(value.strip().upper())
+            continue
+        for code, aliases in REGION_CODES.items():
+            if cleaned in aliases:
+                codes.add(code)
+                break
+        else:
+            # Fall back to substring matches for phrases like "starting with California"
+            # Short aliases such as "US" or "EU" only match as uppercase abbreviations
+            for code, aliases in REGION_CODES.items():
+                for alias in aliases:
+                    pattern, text = (alias.upper(), value) if len(alias) <= 3 else (alias, cleaned)
+                    # Lookarounds instead of \b so aliases ending in "." (u.s.) still match
+                    if re.search(rf"(?<!\w){re.escape(pattern)}(?!\w)", text):
+                        codes.add(code)
+                        break
+    return sorted(codes) or ["GLOBAL"]
+
+def region_matches(code: str, requested: List[str]) -> bool:
+    """GLOBAL documents always apply; US matches US-CA and vice versa"""
+    if code == "GLOBAL" or not requested:
+        return True
+    return any(
+        code == region or region.startswith(f"{code}-") or code.startswith(f"{region}-")
+        for region in requested
+    )
@@ -0,0 +1,84 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agents import ChecklistGeneratorAgent
+
+class FakeDocument:
+    def __init__(self, metadata):
+        self.metadata = metadata
+
+class FakeVectorDB:
+    """Stores metadata by id; similarity search returns every stored section of the filtered name"""
+
+    def __init__(self):
+        self.rows = {}
+
+    def get(self, ids):
+        found = [i for i in ids if i in self.rows]
+        return {"ids": found, "metadatas": [self.rows[i] for i in found]}
+
+    def add_texts(self, texts, metadatas, ids):
+        self.rows.update(zip(ids, metadatas))
+
+    def similarity_search_with_relevance_scores(self, query, k, filter):
+        section = next(clause["section"] for clause in filter["$and"] if "section" in clause)
+        return [
+            (FakeDocument(metadata), 0.95)
+            for metadata in self.rows.values()
+            if metadata.get("type") == "checklist_section" and metadata["section"] == section
+        ][:k]
+
+def make_agent(monkeypatch):
+    agent = ChecklistGeneratorAgent()
+    agent.vector_db = FakeVectorDB()
+    generated = []
+
+    def generate_section(name, inputs, refresh=False):
+        generated.append(name)
+        return f"generated {name}: {inputs['risks']}"
+
+    monkeypatch.setattr(agent, "_generate_section", generate_section)
+    return agent, generated
+
+PRIVACY_RISK = {"risk_name": "GDPR consent", "description": "Consent records are missing", "severity": "High"}
+TAX_RISK = {"risk_name": "VAT registration", "description": "Not registered for VAT", "severity": "Medium"}
+
+def test_changed_section_is_rebuilt_instead_of_returning_stored_checklist(monkeypatch):
+    agent, generated = make_agent(monkeypatch)
+    agent.generate_checklist("saas", "EU", "seed", [PRIVACY_RISK], [])
+    generated.clear()
+
+    result = agent.generate_checklist("saas", "EU", "seed", [PRIVACY_RISK, TAX_RISK], [])
+
+    assert generated == ["Tax & Financial Compliance"]
+    assert set(result["sections"]) == set(agent.SECTIONS)
+    assert "VAT registration" in result["sections"]["Tax & Financial Compliance"]
+    assert "VAT registration" in result["checklist"]
+
+def test_similar_stored_section_is_reused_per_section(monkeypatch):
+    agent, generated = make_agent(monkeypatch)
+    agent.generate_checklist("saas", "EU", "seed", [PRIVACY_RISK], [])
+    generated.clear()
+
+    reworded = {**PRIVACY_RISK, "description": "Consent records are incomplete"}
+    result = agent.generate_checklist("saas", "EU", "seed", [reworded], [])
+
+    assert generated == []
+    assert result["metadata"]["reused_sections"] == {"Data Privacy & Protection": 0.95}
+    assert result["sections"]["Data Privacy & Protection"].startswith("generated Data Privacy & Protection")
+
+def test_stale_stored_section_is_not_reused(monkeypatch):
+    agent, generated = make_agent(monkeypatch)
+    agent.generate_checklist("saas", "EU", "seed", [PRIVACY_RISK], [])
+    for metadata in agent.vector_db.rows.values():
+        metadata["created_at"] = time.time() - 60 * 24 * 3600
+    generated.clear()
+
+    reworded = {**PRIVACY_RISK, "description": "Consent records are incomplete"}
+    result = agent.generate_checklist("saas", "EU", "seed", [reworded], [])
+
+    assert generated == ["Data Privacy & Protection"]
+    assert result["metadata"]["reused_sections"] == {}
@@ -0,0 +1,43 @@
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import locked_cached_property
+
+class Clients:
+    def __init__(self):
+        self.builds = 0
+
+    @locked_cached_property
+    def client(self):
+        self.builds += 1
+        # Widen the window in which a second thread could start its own build
+        time.sleep(0.05)
+        return object()
+
+def test_concurrent_first_use_builds_one_client():
+    clients = Clients()
+    barrier = threading.Barrier(8)
+    seen = []
+
+    def use():
+        barrier.wait()
+        seen.append(clients.client)
+
+    threads = [threading.Thread(target=use) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert clients.builds == 1
+    assert len({id(client) for client in seen}) == 1
+
+def test_value_can_be_replaced():
+    clients = Clients()
+    clients.client = "stub"
+    assert clients.client == "stub"
+    assert clients.builds == 0
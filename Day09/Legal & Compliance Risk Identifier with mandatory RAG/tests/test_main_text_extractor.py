@@ -0,0 +1,30 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import MainTextExtractor, _StdlibHTMLBackend, _html_backend
+
+PAGE = (
+    "<html><head><script>var tracking = 1;</script></head><body>"
+    "<nav><a href='/'>Home</a><a href='/about'>About</a></nav>"
+    "<div class='sidebar'><ul><li><a href='#'>Related article</a></li></ul></div>"
+    "<main><h1>Article 5</h1><p>Personal data shall be processed lawfully, fairly &amp; transparently.</p></main>"
+    "<footer>Copyright</footer></body></html>"
+)
+EXPECTED = "Article 5\nPersonal data shall be processed lawfully, fairly & transparently."
+
+def extract(backend, chunk_size=16):
+    extractor = MainTextExtractor(max_chars=1000, backend=backend)
+    for i in range(0, len(PAGE), chunk_size):
+        extractor.feed(PAGE[i:i + chunk_size])
+    return extractor.text()
+
+def test_stdlib_backend_extracts_main_text():
+    assert extract(_StdlibHTMLBackend) == EXPECTED
+
+def test_lxml_backend_matches_stdlib():
+    pytest.importorskip("lxml")
+    assert extract(_html_backend) == EXPECTED
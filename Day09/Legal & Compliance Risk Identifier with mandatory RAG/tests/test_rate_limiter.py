@@ -0,0 +1,40 @@
+import os
+import sys
+import types
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rate_limiter import RateLimiter
+import utils
+
+def test_call_forwards_model_keyword_to_fn():
+    limiter = RateLimiter()
+    limiter.configure("models/embedding-001", requests_per_minute=1000)
+
+    def embed_content(model, content):
+        return {"model": model, "content": content}
+
+    result = limiter.call("models/embedding-001", embed_content, tokens=1, model="models/embedding-001", content="text")
+    assert result == {"model": "models/embedding-001", "content": "text"}
+
+def test_vector_store_get_embedding(monkeypatch):
+    calls = []
+
+    def embed_content(**kwargs):
+        calls.append(kwargs)
+        return {"embedding": [0.1, 0.2, 0.3]}
+
+    genai = types.ModuleType("google.generativeai")
+    genai.embed_content = embed_content
+    google = types.ModuleType("google")
+    google.generativeai = genai
+    monkeypatch.setitem(sys.modules, "google", google)
+    monkeypatch.setitem(sys.modules, "google.generativeai", genai)
+    monkeypatch.setattr(utils, "get_rate_limiter", lambda: RateLimiter())
+
+    store = utils.VectorStore.__new__(utils.VectorStore)
+    embedding = store._get_embedding("GDPR applies to personal data")
+
+    assert embedding.tolist() == [0.1, 0.2, 0.3]
+    assert calls[0]["model"] == "models/embedding-001"
+    assert calls[0]["content"] == "GDPR applies to personal data"
@@ -0,0 +1,153 @@
+import os
+import sys
+import json
+import time
+import uuid
+import threading
+import contextvars
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, Any, List, Optional
+
+_current_trace = contextvars.ContextVar("current_trace", default=None)
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+def _percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * (len(ordered) - 1)))))
+    return ordered[index]
+
+def summarize_spans(spans: List[Dict[str, Any]]) -> Dict[str, Dict[str, float]]:
+    """Aggregate span durations per name into count, total, p50 and p95 (milliseconds)"""
+    durations = {}
+    for span in spans:
+        durations.setdefault(span["name"], []).append(span["duration_ms"])
+    return {
+        name: {
+            "count": len(values),
+            "total_ms": round(sum(values), 1),
+            "p50_ms": round(_percentile(values, 50), 1),
+            "p95_ms": round(_percentile(values, 95), 1)
+        }
+        for name, values in sorted(durations.items(), key=lambda item: -sum(item[1]))
+    }
+
+class Tracer:
+    """Collects timing spans in memory and optionally appends them to a JSON lines file"""
+
+    def __init__(self, export_path: Optional[str] = None, max_spans: int = 10000):
+        self.export_path = export_path
+        self._spans = deque(maxlen=max_spans)
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def trace(self, name: str, **attributes):
+        """Start a new trace; spans created inside it share its trace id.
+
+        Inside an active trace this only opens a span and yields the enclosing
+        trace id, so callers that start their own trace (load_test.py, the app)
+        see the spans of workflows that also call trace().
+        """
+        active = _current_trace.get()
+        if active is not None:
+            with self.span(name, **attributes):
+                yield active
+            return
+        trace_id = uuid.uuid4().hex
+        token = _current_trace.set(trace_id)
+        try:
+            with self.span(name, **attributes):
+                yield trace_id
+        finally:
+            _current_trace.reset(token)
+
+    @contextmanager
+    def span(self, name: str, **attributes):
+        """Time the enclosed block; the yielded dict can be used to add attributes"""
+        span_id = uuid.uuid4().hex[:16]
+        parent_id = _current_span.get()
+        token = _current_span.set(span_id)
+        start = time.time()
+        error = None
+        try:
+            yield attributes
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            _current_span.reset(token)
+            self.record(name, start, time.time() - start, span_id=span_id, parent_id=parent_id, error=error, **attributes)
+
+    def record(self, name: str, start: float, duration: float, span_id: Optional[str] = None,
+               parent_id: Optional[str] = None, error: Optional[str] = None, **attributes) -> None:
+        """Record a span that was timed by the caller (e.g. across generator yields)"""
+        span = {
+            "trace_id": _current_trace.get(),
+            "span_id": span_id or uuid.uuid4().hex[:16],
+            "parent_id": parent_id if span_id else _current_span.get(),
+            "name": name,
+            "start": start,
+            "duration_ms": round(duration * 1000, 2),
+            "attributes": attributes,
+            "error": error
+        }
+        with self._lock:
+            self._spans.append(span)
+            if self.export_path:
+                with open(self.export_path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(span, default=str) + "\n")
+
+    def spans(self, trace_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        with self._lock:
+            spans = list(self._spans)
+        if trace_id is not None:
+            spans = [span for span in spans if span["trace_id"] == trace_id]
+        return spans
+
+    def summary(self, trace_id: Optional[str] = None) -> Dict[str, Dict[str, float]]:
+        return summarize_spans(self.spans(trace_id))
+
+    def export_jsonl(self, path: str, trace_id: Optional[str] = None) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            for span in self.spans(trace_id):
+                f.write(json.dumps(span, default=str) + "\n")
+
+class TracedProxy:
+    """Wrap an object so each public method call is recorded as a `<prefix>.<method>` span"""
+
+    def __init__(self, target: Any, prefix: str, **attributes):
+        self._target = target
+        self._prefix = prefix
+        self._attributes = attributes
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self._target, name)
+        if name.startswith("_") or not callable(attr):
+            return attr
+
+        def traced(*args, **kwargs):
+            with get_tracer().span(f"{self._prefix}.{name}", **self._attributes):
+                return attr(*args, **kwargs)
+        return traced
+
+_tracer = None
+_tracer_lock = threading.Lock()
+
+def get_tracer() -> Tracer:
+    """Process-wide tracer; set TRACE_FILE to also stream spans to a JSON lines file"""
+    global _tracer
+    with _tracer_lock:
+        if _tracer is None:
+            _tracer = Tracer(export_path=os.getenv("TRACE_FILE") or None)
+        return _tracer
+
+if __name__ == "__main__":
+    # Print the per-stage p50/p95 summary of an exported trace file
+    if len(sys.argv) != 2:
+        print("Usage: python tracing.py <trace.jsonl>")
+        sys.exit(1)
+    with open(sys.argv[1], "r", encoding="utf-8") as f:
+        spans = [json.loads(line) for line in f if line.strip()]
+    print(f"{'stage':<32}{'count':>8}{'total_ms':>12}{'p50_ms':>10}{'p95_ms':>10}")
+    for name, stats in summarize_spans(spans).items():
+        print(f"{name:<32}{stats['count']:>8}{stats['total_ms']:>12}{stats['p50_ms']:>10}{stats['p95_ms']:>10}")
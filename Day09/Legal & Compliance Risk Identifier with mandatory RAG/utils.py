@@ -1,11 +1,466 @@
 import os
+import re
 import json
-import numpy as np
-from typing import List, Dict, Any, Optional, Tuple
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from functools import cached_property
+from html.parser import HTMLParser
+from typing import TYPE_CHECKING, List, Dict, Any, Optional, Tuple
 from pathlib import Path
 from dataclasses import dataclass
-import google.generativeai as genai
-from langchain.text_splitter import RecursiveCharacterTextSplitter
+from rate_limiter import get_rate_limiter
+from tracing import get_tracer
+from endpoints import google_client_options
+
+if TYPE_CHECKING:
+    # numpy is imported where it is used so importing utils stays cheap
+    import numpy as np
+
+def normalize_description(text: str) -> str:
+    """Normalize a business description so trivial edits map to the same key"""
+    return " ".join(text.split()).lower()
+
+def description_key(text: str) -> str:
+    """Stable hash of the normalized business description"""
+    return hashlib.sha256(normalize_description(text).encode("utf-8")).hexdigest()
+
+class ResultCache:
+    """Thread-safe in-memory LRU cache with per-entry TTL"""
+
+    def __init__(self, max_entries: int = 128, ttl: float = 3600):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value, or None if missing or expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            stored_at, value = entry
+            if self.ttl and time.time() - stored_at > self.ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any) -> None:
+        """Store a value, evicting the least recently used entries past the cap"""
+        with self._lock:
+            self._entries[key] = (time.time(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+        self.waiters = 0
+
+    def wait(self, timeout: Optional[float] = None) -> Any:
+        """Block until the leader resolves the flight; re-raises the leader's error"""
+        if not self.done.wait(timeout):
+            raise TimeoutError("Timed out waiting for a coalesced computation")
+        if self.error is not None:
+            raise self.error
+        return self.value
+
+class locked_cached_property(cached_property):
+    """cached_property whose first computation runs once per instance under a lock.
+
+    functools.cached_property no longer locks (Python 3.12+), so concurrent first
+    accesses would each build the value. Once cached, reads bypass the descriptor.
+    """
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        # One lock per property, so building vector_db can still read embeddings;
+        # setdefault is atomic, so every thread sees the same lock
+        lock = instance.__dict__.setdefault(f"_{self.attrname}_lock", threading.Lock())
+        with lock:
+            if self.attrname in instance.__dict__:
+                return instance.__dict__[self.attrname]
+            return super().__get__(instance, owner)
+
+class SingleFlight:
+    """Coalesce concurrent computations of the same key into one execution.
+
+    The first caller for a key becomes the leader and computes the value; callers
+    arriving while it runs wait for and share the leader's result (or error).
+    Nothing is cached: once the leader finishes, the next call computes again.
+    """
+
+    def __init__(self):
+        self._flights = {}
+        self._lock = threading.Lock()
+        self.coalesced = 0
+
+    def claim(self, key: str) -> Tuple[_Flight, bool]:
+        """Return the flight for key and whether the caller is its leader"""
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is not None:
+                flight.waiters += 1
+                self.coalesced += 1
+                return flight, False
+            flight = self._flights[key] = _Flight()
+            return flight, True
+
+    def resolve(self, key: str, flight: _Flight, value: Any = None, error: Optional[BaseException] = None) -> None:
+        """Publish the leader's outcome to every waiter and release the key"""
+        with self._lock:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+        flight.value = value
+        flight.error = error
+        flight.done.set()
+
+    def do(self, key: str, compute) -> Any:
+        flight, leader = self.claim(key)
+        if not leader:
+            return flight.wait()
+        try:
+            value = compute()
+        except BaseException as e:
+            self.resolve(key, flight, error=e)
+            raise
+        self.resolve(key, flight, value=value)
+        return value
+
+    def __len__(self) -> int:
+        return len(self._flights)
+
+class StreamingJSONObjectParser:
+    """Incrementally extract top-level JSON objects from streamed LLM output.
+
+    Text outside objects (markdown code fences, the surrounding array brackets,
+    commas, prose) is ignored, and each object is emitted as soon as its closing
+    brace arrives. Every character is inspected once, so parsing stays linear.
+    """
+
+    _special = re.compile(r'[{}"\\]')
+
+    def __init__(self):
+        self._parts = []
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+
+    def feed(self, chunk: str) -> List[Dict[str, Any]]:
+        """Consume a chunk of text and return any objects completed by it"""
+        objects = []
+        pos = 0
+        while pos < len(chunk):
+            if self._escape:
+                # Character after a backslash inside a string, possibly from a new chunk
+                self._parts.append(chunk[pos])
+                self._escape = False
+                pos += 1
+                continue
+            match = self._special.search(chunk, pos)
+            if match is None:
+                if self._depth:
+                    self._parts.append(chunk[pos:])
+                break
+            char, end = match.group(), match.end()
+            if self._depth == 0:
+                # Outside any object only an opening brace matters
+                if char == "{":
+                    self._depth = 1
+                    self._parts = ["{"]
+                pos = end
+                continue
+            self._parts.append(chunk[pos:end])
+            if self._in_string:
+                if char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char == "{":
+                self._depth += 1
+            elif char == "}":
+                self._depth -= 1
+                if self._depth == 0:
+                    parsed = self._load("".join(self._parts))
+                    if parsed is not None:
+                        objects.append(parsed)
+                    self._parts = []
+            pos = end
+        return objects
+
+    @staticmethod
+    def _load(text: str) -> Optional[Dict[str, Any]]:
+        try:
+            parsed = json.loads(text)
+        except ValueError:
+            # Tolerate trailing commas, a common LLM formatting slip
+            try:
+                parsed = json.loads(re.sub(r",\s*([}\]])", r"\1", text))
+            except ValueError:
+                return None
+        return parsed if isinstance(parsed, dict) else None
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about four characters per token for English text)"""
+    return (len(text) + 3) // 4
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase alphanumeric terms, as used for relevance scoring and BM25"""
+    return re.findall(r"[a-z0-9]+", text.lower())
+
+class ContextBuilder:
+    """Pack retrieved passages into a prompt context under an explicit token budget.
+
+    Passages are dicts with "text" and "source" plus optional "score" (higher is
+    more relevant) and "header" (prepended verbatim). They are packed in relevance
+    order, near-duplicates are dropped, and long passages are compressed by
+    keeping the sentences that best match the query.
+    """
+
+    def __init__(self, max_tokens: int = 2000, max_passage_tokens: int = 400, duplicate_threshold: float = 0.8):
+        self.max_tokens = max_tokens
+        self.max_passage_tokens = max_passage_tokens
+        self.duplicate_threshold = duplicate_threshold
+
+    @staticmethod
+    def _shingles(text: str) -> set:
+        words = tokenize(text)
+        return {" ".join(words[i:i + 3]) for i in range(max(len(words) - 2, 1))}
+
+    @staticmethod
+    def _relevance(query_terms: set, text: str) -> float:
+        terms = tokenize(text)
+        if not terms or not query_terms:
+            return 0.0
+        matches = sum(1 for term in terms if term in query_terms)
+        coverage = len(query_terms & set(terms)) / len(query_terms)
+        return coverage + matches / len(terms)
+
+    def _compress(self, query_terms: set, text: str, max_tokens: int) -> str:
+        """Extractive compression: keep the best-matching sentences in original order"""
+        if estimate_tokens(text) <= max_tokens:
+            return text
+        sentences, seen = [], set()
+        for sentence in re.split(r"(?<=[.!?])\s+|\n+", text):
+            normalized = " ".join(tokenize(sentence))
+            if normalized and normalized not in seen:
+                seen.add(normalized)
+                sentences.append(sentence)
+        ranked = sorted(range(len(sentences)), key=lambda i: self._relevance(query_terms, sentences[i]), reverse=True)
+        kept, used = set(), 0
+        for i in ranked:
+            cost = estimate_tokens(sentences[i]) + 1
+            if used + cost > max_tokens:
+                continue
+            kept.add(i)
+            used += cost
+        if not kept:
+            return sentences[ranked[0]][:max_tokens * 4] if sentences else ""
+        return " ".join(sentences[i].strip() for i in sorted(kept))
+
+    def build(self, query: str, passages: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Select and compress passages for a query.
+        
+        Returns:
+            Dict with the packed "context" string, the "sources" that made the cut,
+            the "dropped" sources and the estimated "tokens" used
+        """
+        query_terms = set(tokenize(query))
+        candidates = [p for p in passages if isinstance(p.get("text"), str) and p["text"].strip()]
+        ranked = sorted(
+            candidates,
+            key=lambda p: p["score"] if p.get("score") is not None else self._relevance(query_terms, p["text"]),
+            reverse=True
+        )
+
+        blocks, sources, dropped, kept_shingles = [], [], [], []
+        used = 0
+        for passage in ranked:
+            shingles = self._shingles(passage["text"])
+            if any(len(shingles & other) / len(shingles | other) >= self.duplicate_threshold for other in kept_shingles):
+                dropped.append(passage.get("source"))
+                continue
+            header = passage.get("header", "")
+            remaining = self.max_tokens - used - estimate_tokens(header)
+            if remaining < 50:
+                dropped.append(passage.get("source"))
+                continue
+            text = self._compress(query_terms, passage["text"], min(self.max_passage_tokens, remaining))
+            block = header + text
+            blocks.append(block)
+            sources.append(passage.get("source"))
+            kept_shingles.append(shingles)
+            used += estimate_tokens(block)
+
+        return {
+            "context": "\n\n".join(blocks),
+            "sources": sources,
+            "dropped": dropped,
+            "tokens": used
+        }
+
+class _StdlibHTMLBackend(HTMLParser):
+    """Pure-Python fallback tokenizer forwarding events to a MainTextExtractor"""
+
+    def __init__(self, sink: "MainTextExtractor"):
+        super().__init__(convert_charrefs=True)
+        self.handle_starttag = sink.handle_starttag
+        self.handle_endtag = sink.handle_endtag
+        self.handle_data = sink.handle_data
+
+class _LxmlTarget:
+    """Parser target adapting lxml's start/end/data callbacks to MainTextExtractor"""
+
+    def __init__(self, sink: "MainTextExtractor"):
+        self.sink = sink
+
+    def start(self, tag, attrib):
+        self.sink.handle_starttag(tag, attrib.items())
+
+    def end(self, tag):
+        self.sink.handle_endtag(tag)
+
+    def data(self, data):
+        self.sink.handle_data(data)
+
+    def comment(self, text):
+        pass
+
+    def close(self):
+        return None
+
+def _html_backend(sink: "MainTextExtractor"):
+    """libxml2's C tokenizer when lxml is installed, otherwise html.parser"""
+    try:
+        from lxml import etree
+    except ImportError:
+        return _StdlibHTMLBackend(sink)
+    return etree.HTMLParser(target=_LxmlTarget(sink), recover=True, no_network=True)
+
+class MainTextExtractor:
+    """Incremental, readability-style text extractor for HTML pages.
+
+    Text is collected per block element; boilerplate containers are skipped and
+    link-heavy blocks (menus, related-links lists) are dropped. Blocks inside
+    <main>, <article> or content-like containers are preferred. `done` turns
+    True once enough text has been collected so the caller can stop feeding.
+    Pages are tokenized by lxml when it is installed (about twice as fast),
+    falling back to the standard library's html.parser.
+    """
+
+    SKIP_TAGS = {"script", "style", "nav", "footer", "header", "aside", "noscript", "form", "svg", "iframe"}
+    BLOCK_TAGS = {"p", "li", "h1", "h2", "h3", "h4", "h5", "h6", "td", "th", "pre", "blockquote", "dd", "dt", "div", "section", "br"}
+    MAIN_TAGS = {"main", "article"}
+    VOID_TAGS = {"br", "img", "hr", "input", "meta", "link", "source", "wbr", "area", "base", "col", "embed", "param", "track"}
+    _main_hint = re.compile(r"content|main|article|body-text|post|entry", re.I)
+
+    def __init__(self, max_chars: int = 1000, backend=None):
+        self.max_chars = max_chars
+        self.main_blocks = []
+        self.other_blocks = []
+        self.main_chars = 0
+        self.other_chars = 0
+        self._stack = []
+        self._skip_depth = 0
+        self._main_depth = 0
+        self._block = []
+        self._link_chars = 0
+        self._in_link = 0
+        self._closed = False
+        self._backend = (backend or _html_backend)(self)
+
+    def feed(self, data: str) -> None:
+        self._backend.feed(data)
+
+    def close(self) -> None:
+        """Deliver any text the tokenizer is still buffering"""
+        if not self._closed:
+            self._closed = True
+            try:
+                self._backend.close()
+            except Exception:
+                # lxml raises on documents it could not recover anything from
+                pass
+
+    @property
+    def done(self) -> bool:
+        return self.main_chars >= self.max_chars or self.other_chars >= 4 * self.max_chars
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.BLOCK_TAGS:
+            self._flush()
+        if tag in self.VOID_TAGS:
+            return
+        hint = " ".join(value or "" for name, value in attrs if name in ("id", "class", "role"))
+        is_main = tag in self.MAIN_TAGS or bool(self._main_hint.search(hint))
+        self._stack.append((tag, tag in self.SKIP_TAGS, is_main))
+        self._skip_depth += tag in self.SKIP_TAGS
+        self._main_depth += is_main
+        self._in_link += tag == "a"
+
+    def handle_endtag(self, tag):
+        if tag in self.VOID_TAGS:
+            return
+        # Pop to the matching open tag, tolerating unclosed inner elements
+        if not any(open_tag == tag for open_tag, _, _ in self._stack):
+            return
+        if tag in self.BLOCK_TAGS or tag in self.MAIN_TAGS:
+            self._flush()
+        while self._stack:
+            open_tag, skipped, is_main = self._stack.pop()
+            self._skip_depth -= skipped
+            self._main_depth -= is_main
+            self._in_link -= open_tag == "a"
+            if open_tag == tag:
+                break
+
+    def handle_data(self, data):
+        if self._skip_depth or self.done:
+            return
+        # Keep raw data: a chunk boundary can split a word across two calls
+        self._block.append(data)
+        if self._in_link:
+            self._link_chars += len(data.strip())
+
+    def _flush(self):
+        text = " ".join("".join(self._block).split())
+        link_chars = self._link_chars
+        self._block = []
+        self._link_chars = 0
+        if not text or link_chars > len(text) / 2:
+            return
+        if self._main_depth:
+            self.main_blocks.append(text)
+            self.main_chars += len(text)
+        else:
+            self.other_blocks.append(text)
+            self.other_chars += len(text)
+
+    def text(self) -> str:
+        self.close()
+        self._flush()
+        return "\n".join(self.main_blocks or self.other_blocks)[:self.max_chars]
 
 @dataclass
 class Document:
@@ -15,16 +470,20 @@ class Document:
 class VectorStore:
     def __init__(self, store_path: str = "vector_store"):
         self.store_path = store_path
-        # Initialize Google Generative AI
-        genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
+        # Initialize Google Generative AI (imported here to keep `import utils` light)
+        import google.generativeai as genai
+        genai.configure(api_key=os.getenv("GOOGLE_API_KEY"), **google_client_options())
         self.model = genai.GenerativeModel('gemini-pro')
         
         # Store documents and metadata
         self.documents = []
         self.vectors = []
         self.metadata = []
+        # Bumped on every change so callers can invalidate derived caches
+        self.version = 0
         
         # Initialize text splitter
+        from langchain.text_splitter import RecursiveCharacterTextSplitter
         self.text_splitter = RecursiveCharacterTextSplitter(
             chunk_size=1000,
             chunk_overlap=200,
@@ -39,12 +498,14 @@ class VectorStore:
         if os.path.exists(f"{self.store_path}.json"):
             with open(f"{self.store_path}.json", 'r') as f:
                 data = json.load(f)
+                import numpy as np
                 self.documents = data.get("documents", [])
                 self.vectors = [np.array(v) for v in data.get("vectors", [])]
                 self.metadata = data.get("metadata", [])
     
     def _save_store(self):
         """Save vector store data"""
+        self.version += 1
         with open(f"{self.store_path}.json", 'w') as f:
             json.dump({
                 "documents": self.documents,
@@ -52,18 +513,25 @@ class VectorStore:
                 "metadata": self.metadata
             }, f)
     
-    def _get_embedding(self, text: str) -> np.ndarray:
+    def _get_embedding(self, text: str) -> "np.ndarray":
         """Get embedding for a text using Google's embedding model"""
-        response = genai.embed_content(
-            model="models/embedding-001",
-            content=text,
-            task_type="retrieval_document",
-            title="Document"
-        )
+        import numpy as np
+        import google.generativeai as genai
+        with get_tracer().span("embedding", model="models/embedding-001", texts=1, tokens=len(text) // 4):
+            response = get_rate_limiter().call(
+                "models/embedding-001",
+                genai.embed_content,
+                tokens=len(text) // 4,
+                model="models/embedding-001",
+                content=text,
+                task_type="retrieval_document",
+                title="Document"
+            )
         return np.array(response["embedding"])
     
-    def _cosine_similarity(self, a: np.ndarray, b: np.ndarray) -> float:
+    def _cosine_similarity(self, a: "np.ndarray", b: "np.ndarray") -> float:
         """Calculate cosine similarity between two vectors"""
+        import numpy as np
         return np.dot(a, b) / (np.linalg.norm(a) * np.linalg.norm(b))
     
     def add_business_analysis(self, business_desc: str, analysis: Dict[str, Any]):
@@ -118,6 +586,29 @@ class VectorStore:
         # Save changes
         self._save_store()
     
+    def has_legal_document(self, source_key: str, version: str) -> bool:
+        """Check whether a generated source document is already stored at this version"""
+        return any(
+            meta.get("type") == "legal_document"
+            and meta.get("source_key") == source_key
+            and meta.get("version") == version
+            for meta in self.metadata
+        )
+
+    def remove_legal_documents(self, source_key: str) -> int:
+        """Remove every chunk of a source document, returning the number removed"""
+        keep = [
+            i for i, meta in enumerate(self.metadata)
+            if not (meta.get("type") == "legal_document" and meta.get("source_key") == source_key)
+        ]
+        removed = len(self.metadata) - len(keep)
+        if removed:
+            self.documents = [self.documents[i] for i in keep]
+            self.vectors = [self.vectors[i] for i in keep]
+            self.metadata = [self.metadata[i] for i in keep]
+            self._save_store()
+        return removed
+
     def similarity_search_with_score(self, query: str, k: int = 3) -> List[Tuple[Document, float]]:
         """Search for similar documents and return them with their similarity scores."""
         query_vector = self._get_embedding(query)
@@ -129,6 +620,7 @@ class VectorStore:
         ]
         
         # Get top k results
+        import numpy as np
         top_k_indices = np.argsort(similarities)[-k:][::-1]
         
         results = []
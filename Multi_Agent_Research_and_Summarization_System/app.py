@@ -1,18 +1,14 @@
 import os
 import streamlit as st
-import pdfplumber
-from docx import Document as DocxDocument
 
 from langchain_community.vectorstores import FAISS
 from langchain.docstore.document import Document
-from langchain.chains import RetrievalQA
-from langchain.prompts import PromptTemplate
 from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langgraph.graph import StateGraph
-from langchain_core.runnables import RunnableLambda
 
 from langchain_google_genai import ChatGoogleGenerativeAI, GoogleGenerativeAIEmbeddings
 from langchain_community.tools import DuckDuckGoSearchRun
+from doc_index import sync_index, directory_fingerprint
+from research_graph import build_research_graph, run_research_graph
 from dotenv import load_dotenv
 load_dotenv()
 # ---------------------- CONFIGURATION ----------------------
@@ -21,124 +17,70 @@ GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
 if not GOOGLE_API_KEY:
     raise ValueError("GOOGLE_API_KEY not found in environment variables")
 
-llm = ChatGoogleGenerativeAI(model="gemini-1.5-flash", temperature=0.3)
-embeddings = GoogleGenerativeAIEmbeddings(model="models/embedding-001")
-text_splitter = RecursiveCharacterTextSplitter(chunk_size=500, chunk_overlap=50)
-search = DuckDuckGoSearchRun()
-
-# ---------------------- FILE PARSER ----------------------
-def extract_text_from_local_path(path):
-    if path.endswith(".pdf"):
-        with pdfplumber.open(path) as pdf:
-            return "\n".join([page.extract_text() for page in pdf.pages if page.extract_text()])
-    elif path.endswith(".txt"):
-        with open(path, "r", encoding="utf-8") as f:
-            return f.read()
-    elif path.endswith(".docx"):
-        doc = DocxDocument(path)
-        return "\n".join([p.text for p in doc.paragraphs])
-    return ""
-
-# ---------------------- AGENTS ----------------------
-def router_agent(state):
-    query = state.get("query", "")
-    route_prompt = PromptTemplate.from_template(
-        "Classify the query into one of [web, rag, llm]:\n\nQuery: {query}\n\nAnswer:"
+# Clients are created once per process, not on every Streamlit rerun
+@st.cache_resource(show_spinner=False)
+def get_clients():
+    return (
+        ChatGoogleGenerativeAI(model="gemini-1.5-flash", temperature=0.3),
+        GoogleGenerativeAIEmbeddings(model="models/embedding-001"),
+        DuckDuckGoSearchRun()
     )
-    route_result = (route_prompt | llm).invoke({"query": query}).content.lower()
-    route = "llm"
-    if "web" in route_result:
-        route = "web"
-    elif "rag" in route_result:
-        route = "rag"
-    return {**state, "route": route}
-
-def web_agent(state):
-    query = state["query"]
-    try:
-        result = search.run(query)
-        return {**state, "content": result}
-    except Exception as e:
-        return {**state, "content": f"Web search failed: {str(e)}"}
-
-def rag_agent(state):
-    query = state["query"]
-    retriever = state["retriever"]
-    qa_chain = RetrievalQA.from_chain_type(llm=llm, retriever=retriever)
-    answer = qa_chain.run(query)
-    return {**state, "content": answer}
-
-def llm_agent(state):
-    query = state["query"]
-    response = llm.invoke(query)
-    return {**state, "content": response.content}
-
-def summarizer_agent(state):
-    content = state["content"]
-    prompt = PromptTemplate.from_template("Summarize clearly and concisely:\n\n{content}")
-    summary = (prompt | llm).invoke({"content": content}).content
-    return {**state, "final": summary}
-
-# ---------------------- LANGGRAPH ----------------------
-def run_langgraph(user_query, retriever):
-    workflow = StateGraph(dict)
-    workflow.set_entry_point("router")
-
-    workflow.add_node("router", RunnableLambda(router_agent))
-    workflow.add_node("web", RunnableLambda(web_agent))
-    workflow.add_node("rag", RunnableLambda(rag_agent))
-    workflow.add_node("llm", RunnableLambda(llm_agent))
-    workflow.add_node("summarizer", RunnableLambda(summarizer_agent))
 
-    def router_logic(state): return state["route"]
-    workflow.add_conditional_edges("router", router_logic, {
-        "web": "web",
-        "rag": "rag",
-        "llm": "llm"
-    })
+llm, embeddings, search = get_clients()
+text_splitter = RecursiveCharacterTextSplitter(chunk_size=500, chunk_overlap=50)
 
-    for node in ["web", "rag", "llm"]:
-        workflow.add_edge(node, "summarizer")
+# ---------------------- LANGGRAPH ----------------------
+# Compiled once per process; the retriever is passed with each query
+@st.cache_resource(show_spinner=False)
+def get_research_graph():
+    return build_research_graph(llm, search)
 
-    workflow.set_finish_point("summarizer")
-    app = workflow.compile()
-    return app.invoke({"query": user_query, "retriever": retriever})["final"]
+def run_langgraph(user_query, retriever):
+    return run_research_graph(get_research_graph(), user_query, retriever)
 
 # ---------------------- STREAMLIT APP ----------------------
 st.set_page_config(page_title="🔍 Fully Agentic Research Assistant", layout="centered")
 st.title("🧠 Multi-Agent RAG System (LangGraph + Web + RAG + LLM)")
 
-retriever = None
-documents_loaded = False
+# The index is persisted with a manifest of file hashes, so only added, changed or
+# removed files are re-embedded. Keyed by a stat fingerprint of my_docs, the sync
+# runs once at startup and again only when the folder changes.
+@st.cache_resource(max_entries=1, show_spinner=False)
+def get_document_index(fingerprint):
+    # Files are parsed in a process pool (see doc_parser.py) and embedded as each one finishes
+    return sync_index("my_docs", embeddings, text_splitter)
 
-# Load local documents
-if os.path.exists("my_docs"):
-    with st.spinner("📂 Loading documents from 'my_docs' folder..."):
-        all_content = []
-        for filename in os.listdir("my_docs"):
-            filepath = os.path.join("my_docs", filename)
-            if filename.lower().endswith(('.pdf', '.txt', '.docx')):
-                content = extract_text_from_local_path(filepath)
-                if content:
-                    all_content.append(content)
-
-        if all_content:
-            chunks = text_splitter.create_documents(all_content)
-            vectorstore = FAISS.from_documents(chunks, embeddings)
-            retriever = vectorstore.as_retriever()
-            documents_loaded = True
-            st.success(f"✅ Loaded {len(all_content)} documents.")
-        else:
-            st.warning("⚠️ No readable files found.")
-
-if not documents_loaded:
-    st.info("📄 Using fallback knowledge base.")
+@st.cache_resource(show_spinner=False)
+def get_fallback_index():
     docs = [
         Document(page_content="LangGraph is a Python framework for agent workflows."),
         Document(page_content="Gemini 1.5 Flash is fast and great for summarization."),
     ]
-    vectorstore = FAISS.from_documents(docs, embeddings)
-    retriever = vectorstore.as_retriever()
+    return FAISS.from_documents(docs, embeddings)
+
+vectorstore = None
+
+# Load local documents
+if os.path.exists("my_docs"):
+    with st.spinner("📂 Loading documents from 'my_docs' folder..."):
+        vectorstore, report = get_document_index(directory_fingerprint("my_docs"))
+
+    if vectorstore is not None:
+        st.success(f"✅ Loaded {report['documents']} documents.")
+        if report["added"] or report["changed"] or report["removed"]:
+            st.caption(
+                f"Index updated: {len(report['added'])} added, {len(report['changed'])} changed, "
+                f"{len(report['removed'])} removed ({report['chunks_embedded']} chunks embedded)."
+            )
+    else:
+        st.warning("⚠️ No readable files found.")
+    if report["failed"]:
+        st.warning(f"⚠️ Could not parse: {', '.join(report['failed'])}")
+
+if vectorstore is None:
+    st.info("📄 Using fallback knowledge base.")
+    vectorstore = get_fallback_index()
+retriever = vectorstore.as_retriever()
 
 # User Input
 query = st.text_input("💬 Ask your question", placeholder="e.g. What is LangGraph?")
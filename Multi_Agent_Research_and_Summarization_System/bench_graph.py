@@ -0,0 +1,76 @@
+"""
+Micro-benchmark of per-query workflow overhead, excluding LLM time.
+
+The LLM, web search and retriever are replaced by instant in-process stubs, so
+the timings measure only graph construction, compilation and execution:
+
+    python bench_graph.py --queries 200
+
+"rebuild" builds and compiles the graph and its chains for every query (the
+previous behaviour of run_langgraph); "compiled" reuses one compiled graph and
+passes the retriever per invocation, as the app does now.
+"""
+import time
+import argparse
+import statistics
+from typing import Any, List, Optional
+from langchain_core.documents import Document
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.retrievers import BaseRetriever
+from research_graph import build_research_graph, run_research_graph
+
+ROUTES = ["rag", "web", "llm"]
+
+class StubChatModel(BaseChatModel):
+    """Answers instantly; the router prompt gets the route for the current query"""
+
+    route: str = "rag"
+
+    @property
+    def _llm_type(self) -> str:
+        return "stub"
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        prompt = messages[-1].content
+        content = self.route if prompt.startswith("Classify the query") else "Stub answer."
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=content))])
+
+class StubRetriever(BaseRetriever):
+    def _get_relevant_documents(self, query: str, *, run_manager: Any = None) -> List[Document]:
+        return [Document(page_content=f"Stub passage {i} about {query}.") for i in range(4)]
+
+class StubSearch:
+    def run(self, query: str) -> str:
+        return f"Stub web results for {query}."
+
+def measure(queries: int, rebuild: bool) -> List[float]:
+    llm = StubChatModel()
+    search = StubSearch()
+    retriever = StubRetriever()
+    graph = None if rebuild else build_research_graph(llm, search)
+    timings = []
+    for i in range(queries):
+        llm.route = ROUTES[i % len(ROUTES)]
+        started = time.perf_counter()
+        current = build_research_graph(llm, search) if rebuild else graph
+        run_research_graph(current, f"query {i}", retriever)
+        timings.append(time.perf_counter() - started)
+    return timings
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-query overhead of the research workflow with stubbed LLM calls")
+    parser.add_argument("--queries", type=int, default=200, help="Queries per mode")
+    parser.add_argument("--warmup", type=int, default=10, help="Unmeasured queries per mode")
+    args = parser.parse_args()
+
+    print(f"{'mode':<10}{'p50_ms':>10}{'p95_ms':>10}{'mean_ms':>10}")
+    for mode in ("rebuild", "compiled"):
+        measure(args.warmup, rebuild=mode == "rebuild")
+        timings = sorted(t * 1000 for t in measure(args.queries, rebuild=mode == "rebuild"))
+        p95 = timings[min(len(timings) - 1, int(round(0.95 * (len(timings) - 1))))]
+        print(f"{mode:<10}{statistics.median(timings):>10.2f}{p95:>10.2f}{statistics.mean(timings):>10.2f}")
+
+if __name__ == "__main__":
+    main()
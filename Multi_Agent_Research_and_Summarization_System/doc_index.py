@@ -0,0 +1,175 @@
+"""
+Persistent, incremental FAISS index over the files in my_docs.
+
+The index is saved to DOC_INDEX_DIR (default: faiss_index) together with a
+manifest recording each file's content hash and the docstore ids of its chunks.
+On sync only added, changed or removed files are re-parsed and re-embedded;
+unchanged files are recognised by size and mtime without re-hashing them.
+Files are parsed in parallel (see doc_parser.py) and each one is chunked and
+embedded as soon as its text is available.
+Changing the chunking settings or the embedding model rebuilds the index.
+"""
+import os
+import json
+import shutil
+import hashlib
+from typing import Dict, Any, List, Optional, Tuple
+from langchain_community.vectorstores import FAISS
+from doc_parser import ParseCache, ParseJob, parse_documents
+
+SUPPORTED_EXTENSIONS = (".pdf", ".txt", ".docx")
+MANIFEST_NAME = "manifest.json"
+MANIFEST_VERSION = 1
+
+def default_index_dir() -> str:
+    return os.getenv("DOC_INDEX_DIR", "faiss_index")
+
+def list_documents(docs_dir: str) -> List[str]:
+    if not os.path.isdir(docs_dir):
+        return []
+    return sorted(
+        filename for filename in os.listdir(docs_dir)
+        if filename.lower().endswith(SUPPORTED_EXTENSIONS) and os.path.isfile(os.path.join(docs_dir, filename))
+    )
+
+def directory_fingerprint(docs_dir: str) -> Tuple[Tuple[str, int, int], ...]:
+    """Cheap stat-only snapshot of docs_dir, used to decide whether a sync is needed"""
+    fingerprint = []
+    for filename in list_documents(docs_dir):
+        stat = os.stat(os.path.join(docs_dir, filename))
+        fingerprint.append((filename, stat.st_size, stat.st_mtime_ns))
+    return tuple(fingerprint)
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def index_settings(text_splitter, embeddings) -> Dict[str, Any]:
+    """Settings that invalidate every stored vector when they change"""
+    return {
+        "chunk_size": getattr(text_splitter, "_chunk_size", None),
+        "chunk_overlap": getattr(text_splitter, "_chunk_overlap", None),
+        "embedding_model": getattr(embeddings, "model", None)
+    }
+
+def load_manifest(index_dir: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(os.path.join(index_dir, MANIFEST_NAME), "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return manifest if manifest.get("version") == MANIFEST_VERSION else None
+
+def load_index(index_dir: str, embeddings) -> Tuple[Optional[FAISS], Optional[Dict[str, Any]]]:
+    """Load the saved index and its manifest, or (None, None) if missing or unreadable"""
+    manifest = load_manifest(index_dir)
+    if manifest is None:
+        return None, None
+    if not any(entry["ids"] for entry in manifest["files"].values()):
+        # Nothing had text when it was saved, so only the manifest exists
+        return None, manifest
+    try:
+        # The pickle is written only by save_index below
+        vectorstore = FAISS.load_local(index_dir, embeddings, allow_dangerous_deserialization=True)
+    except Exception as e:
+        print(f"Could not load FAISS index from {index_dir}, rebuilding: {str(e)}")
+        return None, None
+    return vectorstore, manifest
+
+def save_index(index_dir: str, vectorstore: Optional[FAISS], manifest: Dict[str, Any]) -> None:
+    """Write index and manifest to a sibling directory, then swap it in"""
+    staging = f"{index_dir}.tmp"
+    previous = f"{index_dir}.old"
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+    if vectorstore is not None:
+        vectorstore.save_local(staging)
+    with open(os.path.join(staging, MANIFEST_NAME), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    shutil.rmtree(previous, ignore_errors=True)
+    if os.path.exists(index_dir):
+        os.replace(index_dir, previous)
+    os.replace(staging, index_dir)
+    shutil.rmtree(previous, ignore_errors=True)
+
+def sync_index(docs_dir: str, embeddings, text_splitter, index_dir: Optional[str] = None,
+               parse_cache: Optional[ParseCache] = None, max_workers: Optional[int] = None) -> Tuple[Optional[FAISS], Dict[str, Any]]:
+    """Bring the saved index in line with docs_dir.
+
+    Returns the vector store (None when no file has readable text) and a report
+    with the added, changed, removed, unchanged and failed file names and the
+    number of indexed documents. Files that fail to parse are left out of the
+    manifest so the next sync retries them.
+    """
+    index_dir = index_dir or default_index_dir()
+    settings = index_settings(text_splitter, embeddings)
+    vectorstore, manifest = load_index(index_dir, embeddings)
+    if manifest is not None and manifest.get("settings") != settings:
+        print("Index settings changed, rebuilding the FAISS index")
+        vectorstore, manifest = None, None
+    known: Dict[str, Dict[str, Any]] = manifest["files"] if manifest else {}
+
+    parse_cache = parse_cache or ParseCache()
+    report = {"added": [], "changed": [], "removed": [], "unchanged": [], "failed": [], "chunks_embedded": 0}
+    files: Dict[str, Dict[str, Any]] = {}
+    pending: List[ParseJob] = []
+    stats: Dict[str, Dict[str, Any]] = {}
+    for filename in list_documents(docs_dir):
+        path = os.path.join(docs_dir, filename)
+        stat = os.stat(path)
+        entry = known.get(filename)
+        if entry and entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns:
+            files[filename] = entry
+            report["unchanged"].append(filename)
+            continue
+        sha256 = file_sha256(path)
+        if entry and entry["sha256"] == sha256:
+            # Touched but not modified: keep the vectors, refresh the stat fields
+            files[filename] = {**entry, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+            report["unchanged"].append(filename)
+            continue
+        report["changed" if entry else "added"].append(filename)
+        pending.append(ParseJob(filename, path, sha256, stat.st_mtime_ns))
+        stats[filename] = {"sha256": sha256, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+    report["removed"] = sorted(set(known) - set(files) - set(stats))
+
+    stale_ids = [
+        doc_id
+        for filename in report["changed"] + report["removed"]
+        for doc_id in known[filename]["ids"]
+    ]
+    if vectorstore is not None and stale_ids:
+        vectorstore.delete(stale_ids)
+
+    for result in parse_documents(pending, cache=parse_cache, max_workers=max_workers):
+        filename, entry, text = result.job.name, stats[result.job.name], result.text
+        if result.error is not None:
+            print(f"Could not parse {filename}: {result.error}")
+            report["failed"].append(filename)
+            report["changed" if filename in known else "added"].remove(filename)
+            continue
+        chunks = text_splitter.create_documents([text], metadatas=[{"source": filename}]) if text else []
+        ids = [f"{filename}:{entry['sha256'][:16]}:{i}" for i in range(len(chunks))]
+        if chunks:
+            if vectorstore is None:
+                vectorstore = FAISS.from_documents(chunks, embeddings, ids=ids)
+            else:
+                vectorstore.add_documents(chunks, ids=ids)
+        report["chunks_embedded"] += len(chunks)
+        # Files without text are still recorded so they are not re-parsed on every sync
+        files[filename] = {**entry, "ids": ids}
+
+    report["documents"] = sum(1 for entry in files.values() if entry["ids"])
+    if vectorstore is not None and not report["documents"]:
+        # Every remaining file is empty; FAISS cannot hold an empty index
+        vectorstore = None
+    if files != known or manifest is None:
+        save_index(index_dir, vectorstore, {"version": MANIFEST_VERSION, "settings": settings, "files": files})
+        parse_cache.prune([
+            ParseJob(filename, os.path.join(docs_dir, filename), entry["sha256"], entry["mtime_ns"])
+            for filename, entry in files.items()
+        ])
+    return vectorstore, report
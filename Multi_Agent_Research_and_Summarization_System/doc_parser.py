@@ -0,0 +1,122 @@
+"""
+Parallel text extraction for PDF, TXT and DOCX files.
+
+Files are parsed in a process pool (pdfplumber is CPU-bound and holds the GIL)
+and results are yielded per file as soon as each one finishes, so the caller can
+chunk and embed while the remaining files are still being parsed. Extracted text
+is cached on disk in DOC_PARSE_CACHE_DIR (default: .parse_cache), keyed by the
+file's content hash and mtime, so rebuilding the index does not re-parse.
+"""
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Iterator, List, NamedTuple, Optional
+
+class ParseJob(NamedTuple):
+    name: str
+    path: str
+    sha256: str
+    mtime_ns: int
+
+class ParseResult(NamedTuple):
+    job: ParseJob
+    text: str
+    error: Optional[str] = None
+    cached: bool = False
+
+def extract_text_from_local_path(path):
+    # Imported here so the parent process only pays for them when parsing inline
+    if path.lower().endswith(".pdf"):
+        import pdfplumber
+        with pdfplumber.open(path) as pdf:
+            # extract_text is the expensive part; call it once per page
+            page_texts = (page.extract_text() for page in pdf.pages)
+            return "\n".join(text for text in page_texts if text)
+    elif path.lower().endswith(".txt"):
+        with open(path, "r", encoding="utf-8") as f:
+            return f.read()
+    elif path.lower().endswith(".docx"):
+        from docx import Document as DocxDocument
+        doc = DocxDocument(path)
+        return "\n".join([p.text for p in doc.paragraphs])
+    return ""
+
+def _parse(job: ParseJob) -> ParseResult:
+    try:
+        return ParseResult(job, extract_text_from_local_path(job.path))
+    except Exception as e:
+        return ParseResult(job, "", error=f"{type(e).__name__}: {str(e)}")
+
+class ParseCache:
+    """Extracted text on disk, one file per (content hash, mtime)"""
+
+    def __init__(self, cache_dir: Optional[str] = None):
+        self.cache_dir = cache_dir or os.getenv("DOC_PARSE_CACHE_DIR", ".parse_cache")
+
+    @staticmethod
+    def key(job: ParseJob) -> str:
+        return f"{job.sha256}-{job.mtime_ns}"
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.txt")
+
+    def get(self, job: ParseJob) -> Optional[str]:
+        try:
+            with open(self._path(self.key(job)), "r", encoding="utf-8") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def set(self, job: ParseJob, text: str) -> None:
+        os.makedirs(self.cache_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp_path, self._path(self.key(job)))
+
+    def prune(self, jobs: List[ParseJob]) -> int:
+        """Delete cached text for files that are no longer in jobs"""
+        if not os.path.isdir(self.cache_dir):
+            return 0
+        keep = {f"{self.key(job)}.txt" for job in jobs}
+        removed = 0
+        for filename in os.listdir(self.cache_dir):
+            if filename not in keep:
+                os.remove(os.path.join(self.cache_dir, filename))
+                removed += 1
+        return removed
+
+def default_workers() -> int:
+    return int(os.getenv("DOC_PARSE_WORKERS", str(os.cpu_count() or 1)))
+
+def parse_documents(jobs: List[ParseJob], cache: Optional[ParseCache] = None, max_workers: Optional[int] = None) -> Iterator[ParseResult]:
+    """Yield a ParseResult per job: cache hits first, then parsed files as they complete.
+
+    Failed files are yielded with error set and are not cached.
+    """
+    cache = cache or ParseCache()
+    misses = []
+    for job in jobs:
+        text = cache.get(job)
+        if text is None:
+            misses.append(job)
+        else:
+            yield ParseResult(job, text, cached=True)
+
+    workers = min(max_workers or default_workers(), len(misses))
+    if workers <= 1:
+        # Not worth starting a pool for a single file
+        results = map(_parse, misses)
+    else:
+        executor = ProcessPoolExecutor(max_workers=workers)
+        futures = [executor.submit(_parse, job) for job in misses]
+        results = (future.result() for future in as_completed(futures))
+    try:
+        for result in results:
+            if result.error is None:
+                cache.set(result.job, result.text)
+            yield result
+    finally:
+        if workers > 1:
+            # Consumer stopped early (or failed): drop files not yet started
+            executor.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,92 @@
+"""
+The research workflow: router -> (web | rag | llm) -> summarizer.
+
+build_research_graph compiles the LangGraph workflow and its prompt chains once;
+the compiled graph is reused for every query. The retriever is not part of the
+graph: it is passed in the input state of each invocation, so one compiled
+graph serves any document index.
+"""
+from langgraph.graph import StateGraph
+from langchain_core.prompts import ChatPromptTemplate, PromptTemplate
+from langchain_core.runnables import RunnableLambda
+
+ROUTE_PROMPT = PromptTemplate.from_template(
+    "Classify the query into one of [web, rag, llm]:\n\nQuery: {query}\n\nAnswer:"
+)
+# The prompt RetrievalQA's "stuff" chain selects for chat models such as Gemini:
+# context in a system message, the question as the human message
+RAG_PROMPT = ChatPromptTemplate.from_messages([
+    ("system",
+     "Use the following pieces of context to answer the user's question.\n"
+     "If you don't know the answer, just say that you don't know, don't try to make up an answer.\n"
+     "----------------\n"
+     "{context}"),
+    ("human", "{question}")
+])
+SUMMARY_PROMPT = PromptTemplate.from_template("Summarize clearly and concisely:\n\n{content}")
+
+def build_research_graph(llm, search):
+    """Compile the workflow; invoke with {"query": ..., "retriever": ...} and read "final" """
+    route_chain = ROUTE_PROMPT | llm
+    rag_chain = RAG_PROMPT | llm
+    summary_chain = SUMMARY_PROMPT | llm
+
+    def router_agent(state):
+        query = state.get("query", "")
+        route_result = route_chain.invoke({"query": query}).content.lower()
+        route = "llm"
+        if "web" in route_result:
+            route = "web"
+        elif "rag" in route_result:
+            route = "rag"
+        return {**state, "route": route}
+
+    def web_agent(state):
+        query = state["query"]
+        try:
+            result = search.run(query)
+            return {**state, "content": result}
+        except Exception as e:
+            return {**state, "content": f"Web search failed: {str(e)}"}
+
+    def rag_agent(state):
+        query = state["query"]
+        docs = state["retriever"].invoke(query)
+        context = "\n\n".join(doc.page_content for doc in docs)
+        answer = rag_chain.invoke({"context": context, "question": query}).content
+        return {**state, "content": answer}
+
+    def llm_agent(state):
+        query = state["query"]
+        response = llm.invoke(query)
+        return {**state, "content": response.content}
+
+    def summarizer_agent(state):
+        content = state["content"]
+        summary = summary_chain.invoke({"content": content}).content
+        return {**state, "final": summary}
+
+    workflow = StateGraph(dict)
+    workflow.set_entry_point("router")
+
+    workflow.add_node("router", RunnableLambda(router_agent))
+    workflow.add_node("web", RunnableLambda(web_agent))
+    workflow.add_node("rag", RunnableLambda(rag_agent))
+    workflow.add_node("llm", RunnableLambda(llm_agent))
+    workflow.add_node("summarizer", RunnableLambda(summarizer_agent))
+
+    def router_logic(state): return state["route"]
+    workflow.add_conditional_edges("router", router_logic, {
+        "web": "web",
+        "rag": "rag",
+        "llm": "llm"
+    })
+
+    for node in ["web", "rag", "llm"]:
+        workflow.add_edge(node, "summarizer")
+
+    workflow.set_finish_point("summarizer")
+    return workflow.compile()
+
+def run_research_graph(graph, user_query, retriever):
+    return graph.invoke({"query": user_query, "retriever": retriever})["final"]